@@ -1,30 +1,72 @@
 # backend/app/main.py (기존 내용에 추가/수정)
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from contextlib import asynccontextmanager
 import os
-from pathlib import Path
+import json
+import time
+import asyncio
 import logging
-import uuid # 청크 ID 생성을 위해 추가
 
 # services 모듈 임포트
-from app.services.github_service import clone_repository, get_repo_files, read_file_content
-from app.services.code_parser import chunk_text # AST 파싱은 일단 제외하고 단순 청크 사용
-from app.services.embedding_service import get_embeddings # 새로 추가
-from app.services.vector_db_service import add_documents_to_collection, query_collection # 새로 추가
-from app.services.llm_service import generate_response_from_context
+from app.services.embedding_service import EMBEDDING_BACKEND, EMBEDDING_MODEL, collection_embedding_model, get_embeddings # 새로 추가
+from app.services.vector_db_service import get_collection_metadata, get_repo_collection_name, list_repo_collection_metadata, query_collection_batch, query_collections_batch # 새로 추가
+from app.services.indexing_service import IndexingError, drop_repository_index, export_repository_snapshot, index_repository
+from app.services.job_service import job_scheduler
+from app.services import clone_manager, ingest_pool, lexical_index, service_container, snapshot_service
+from app.services.context_builder import build_context, context_chunk_ids
+from app.services.metrics import (
+    HTTP_REQUEST_SECONDS,
+    SERVER_TIMING_HEADERS,
+    format_server_timing,
+    start_request_timings,
+    track_stage,
+)
+from app.services.llm_service import LLM_MODEL, generate_response_from_context, stream_response_from_context
+from app.services.query_cache import (
+    answer_cache,
+    answer_key,
+    query_embedding_cache,
+    query_embedding_key,
+    retrieval_cache,
+    retrieval_key,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 인덱싱 작업 워커 풀 시작/중지, 종료 시 git/파일 처리 풀과 외부 서비스 클라이언트 정리
+    # 스냅샷 번들은 메모리 매핑으로 열기만 하므로 크기와 관계없이 바로 검색할 수 있음
+    await asyncio.to_thread(snapshot_service.load_all_snapshots)
+    await job_scheduler.start()
+    yield
+    await job_scheduler.stop()
+    clone_manager.shutdown()
+    ingest_pool.shutdown()
+    await service_container.close()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """요청 처리 시간을 기록하고, 설정된 경우 단계별 소요 시간을 Server-Timing 헤더로 붙입니다."""
+    timings = start_request_timings() if SERVER_TIMING_HEADERS else None
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(request.method, route.path if route else "unmatched", str(response.status_code)).observe(elapsed)
+    if timings is not None:
+        response.headers["Server-Timing"] = format_server_timing(timings, elapsed)
+    return response
 
 GITHUB_PAT = os.getenv("GITHUB_PAT")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") # OpenAI API 키도 확인
-REPOS_DIR = Path("./data/repos")
-
-# ChromaDB 컬렉션 이름 (레포지토리별로 다르게 관리하는 것도 좋음)
-# 여기서는 예시를 위해 고정된 이름 사용
-CHROMA_COLLECTION_NAME = "repo_code_chunks" 
 
 
 @app.get("/")
@@ -35,132 +77,500 @@ async def read_root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    """단계별 소요 시간, OpenAI 호출/토큰 수, 캐시 적중률, 큐 길이 등을 Prometheus 텍스트 형식으로 반환합니다."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/repo/process")
 async def process_repo(
     repo_url: str,
     repo_name: str,
-    branch: str = "main"
+    branch: str = "main",
+    incremental: bool = True
 ):
     """
     지정된 GitHub 레포지토리를 클론하고, 파일을 읽어 청크로 분할하고,
     임베딩을 생성하여 벡터 DB에 저장합니다.
+    incremental=True이면 마지막으로 인덱싱한 커밋과의 git diff를 기준으로
+    추가/수정된 파일만 다시 임베딩하고, 삭제/수정된 파일의 기존 청크는 제거합니다.
     """
     if not GITHUB_PAT:
         raise HTTPException(status_code=400, detail="GITHUB_PAT 환경 변수가 설정되지 않았습니다. 개인 액세스 토큰을 .env 파일에 추가해주세요.")
-    if not OPENAI_API_KEY:
+    # 로컬 임베딩 백엔드는 OpenAI API 키 없이 인덱싱 가능
+    if EMBEDDING_BACKEND == "openai" and not OPENAI_API_KEY:
         raise HTTPException(status_code=400, detail="OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
 
-    local_repo_path = REPOS_DIR / repo_name
+    try:
+        return await index_repository(repo_url, repo_name, branch, GITHUB_PAT, incremental)
+    except IndexingError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    REPOS_DIR.mkdir(parents=True, exist_ok=True)
+# --- (인덱싱 작업 API: 백그라운드에서 레포지토리를 처리) ---
+@app.post("/repo/jobs")
+async def submit_index_job(
+    repo_url: str,
+    repo_name: str,
+    branch: str = "main",
+    incremental: bool = True
+):
+    """
+    레포지토리 인덱싱 작업을 백그라운드 큐에 등록하고 바로 작업 정보를 반환합니다.
+    같은 레포/브랜치에 대해 진행 중인 작업이 있으면 그 작업을 반환합니다.
+    """
+    if not GITHUB_PAT:
+        raise HTTPException(status_code=400, detail="GITHUB_PAT 환경 변수가 설정되지 않았습니다. 개인 액세스 토큰을 .env 파일에 추가해주세요.")
+    # 로컬 임베딩 백엔드는 OpenAI API 키 없이 인덱싱 가능
+    if EMBEDDING_BACKEND == "openai" and not OPENAI_API_KEY:
+        raise HTTPException(status_code=400, detail="OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
 
-    logger.info(f"레포지토리 {repo_url} 클론 또는 업데이트 시작.")
-    success = clone_repository(repo_url, local_repo_path, branch, GITHUB_PAT)
+    job, created = job_scheduler.submit(repo_url, repo_name, branch, incremental)
+    return {
+        "message": "인덱싱 작업 등록 완료" if created else "이미 진행 중인 인덱싱 작업이 있습니다.",
+        "created": created,
+        "job": job
+    }
 
-    if not success:
-        raise HTTPException(status_code=500, detail=f"레포지토리 클론 또는 업데이트 실패: {repo_url}")
+@app.get("/repo/jobs")
+async def list_index_jobs(status: str = None):
+    """인덱싱 작업 목록을 최신순으로 반환합니다."""
+    return {"jobs": job_scheduler.list_jobs(status), "queue_depth": job_scheduler.queue_depth()}
 
-    logger.info(f"레포지토리 {repo_name} 파일 스캔 및 청크 생성 시작.")
-    file_paths = get_repo_files(local_repo_path)
+@app.get("/repo/jobs/{job_id}")
+async def get_index_job(job_id: str):
+    """인덱싱 작업의 상태와 단계별 진행 상황을 반환합니다."""
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"인덱싱 작업을 찾을 수 없습니다: {job_id}")
+    return job
 
-    all_chunk_contents = []
-    all_chunk_metadatas = []
-    all_chunk_ids = []
+@app.post("/repo/jobs/{job_id}/cancel")
+async def cancel_index_job(job_id: str):
+    """대기 중이거나 실행 중인 인덱싱 작업을 취소합니다."""
+    job = job_scheduler.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"인덱싱 작업을 찾을 수 없습니다: {job_id}")
+    return job
 
-    for path in file_paths:
-        content = read_file_content(path)
-        if content and content.strip(): # 내용이 비어있지 않은 파일만 처리
-            chunks_from_file = chunk_text(content, path, repo_name)
-            for chunk in chunks_from_file:
-                all_chunk_contents.append(chunk["content"])
-                all_chunk_metadatas.append(chunk["metadata"])
-                all_chunk_ids.append(str(uuid.uuid4())) # 각 청크에 고유 ID 부여
-        else:
-            logger.warning(f"파일 내용이 비어있거나 읽기 실패: {path}")
+@app.delete("/repo/index")
+async def delete_repo_index(repo_name: str):
+    """
+    레포지토리의 벡터 인덱스(컬렉션)와 인덱싱 상태를 삭제합니다.
+    다음 /repo/process 또는 인덱싱 작업은 전체 인덱싱으로 실행됩니다.
+    """
+    try:
+        deleted = await drop_repository_index(repo_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"레포지토리 인덱스 삭제 중 오류 발생: {e}")
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"인덱싱된 레포지토리를 찾을 수 없습니다: {repo_name}")
+    return {"message": f"레포지토리 {repo_name} 인덱스 삭제 완료", "repo_name": repo_name}
 
-    if not all_chunk_contents:
-        return {
-            "message": f"레포지토리 {repo_name}에서 처리할 유효한 청크가 없습니다.",
-            "repo_path": str(local_repo_path),
-            "total_files": len(file_paths),
-            "total_chunks": 0
-        }
+@app.post("/repo/snapshot/export")
+async def export_repo_snapshot(repo_name: str, output_dir: str = None):
+    """
+    레포지토리 인덱스(임베딩 행렬, 청크 내용/메타데이터, 커밋 SHA)를 스냅샷 번들로 내보냅니다.
+    output_dir는 SNAPSHOTS_DIR 아래 경로만 허용합니다 (상대 경로는 SNAPSHOTS_DIR 기준).
+    번들 디렉토리를 다른 서버의 SNAPSHOTS_DIR로 복사하고 /repo/snapshot/import로 불러오면 클론/임베딩 없이 바로 검색할 수 있습니다.
+    """
+    try:
+        manifest = await export_repository_snapshot(repo_name, output_dir)
+    except snapshot_service.SnapshotPathError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except snapshot_service.SnapshotError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"스냅샷 내보내기 중 오류 발생: {e}")
+    return {"message": f"레포지토리 {repo_name} 스냅샷 내보내기 완료", "snapshot": manifest}
 
-    logger.info(f"총 {len(file_paths)}개 파일에서 {len(all_chunk_contents)}개 청크 생성 완료. 임베딩 시작.")
+@app.post("/repo/snapshot/import")
+async def import_repo_snapshot(path: str, verify: bool = True):
+    """
+    서버의 SNAPSHOTS_DIR 아래 path(상대 경로는 SNAPSHOTS_DIR 기준)에 있는 스냅샷 번들을 불러와 해당 레포지토리를 읽기 전용으로 검색합니다.
+    임베딩 행렬은 메모리 매핑으로 검색하며, 키워드 검색 인덱스는 포함하지 않으므로 벡터 검색 결과만 사용됩니다.
+    """
+    try:
+        manifest = await snapshot_service.import_snapshot(path, verify=verify)
+    except snapshot_service.SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"스냅샷 불러오기 중 오류 발생: {e}")
+    return {"message": f"레포지토리 {manifest['repo_name']} 스냅샷 불러오기 완료", "snapshot": manifest}
+
+@app.get("/repo/snapshots")
+async def list_repo_snapshots():
+    """불러온(읽기 전용으로 검색 중인) 스냅샷 목록을 반환합니다."""
+    return {"snapshots": list(snapshot_service.list_snapshots().values())}
+
+@app.delete("/repo/snapshot")
+async def delete_repo_snapshot(repo_name: str, delete_bundle: bool = False):
+    """레포지토리의 스냅샷 검색을 중단합니다. delete_bundle=true이면 저장된 번들도 삭제합니다."""
+    if not await asyncio.to_thread(snapshot_service.unload_snapshot, repo_name, delete_bundle):
+        raise HTTPException(status_code=404, detail=f"불러온 스냅샷을 찾을 수 없습니다: {repo_name}")
+    return {"message": f"레포지토리 {repo_name} 스냅샷 해제 완료", "repo_name": repo_name}
+
+# --- (추가 API: 벡터 DB에서 쿼리하는 엔드포인트) ---
+# 검색 모드: 벡터 검색만 / 키워드(BM25) 검색만 / 두 결과를 순위 융합
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+# 배치 질의 API: 한 요청에 담을 수 있는 최대 질문 수와 동시에 생성할 AI 답변 수
+BATCH_QUERY_MAX_QUESTIONS = int(os.getenv("BATCH_QUERY_MAX_QUESTIONS", "50"))
+BATCH_QUERY_CONCURRENCY = int(os.getenv("BATCH_QUERY_CONCURRENCY", "4"))
+
+def _check_collection_embedding(repo_name: str, collection_metadata: dict | None):
+    """레포지토리 컬렉션이 다른 임베딩 모델로 만들어졌으면 409 오류를 발생시킵니다."""
+    if collection_metadata is not None and collection_embedding_model(collection_metadata) != EMBEDDING_MODEL:
+        raise HTTPException(
+            status_code=409,
+            detail=f"레포지토리 {repo_name}의 인덱스는 '{collection_embedding_model(collection_metadata)}' 임베딩으로 만들어져 "
+                   f"현재 임베딩('{EMBEDDING_MODEL}')으로 검색할 수 없습니다. 레포지토리를 다시 인덱싱하거나 mode=lexical을 사용하세요."
+        )
 
-    # 임베딩 생성 (비동기 함수이므로 await 사용)
+async def _search_vector_batch(query_texts: list[str], repo_name: str | None, n_results: int, cache_hits: list[dict]) -> list[list[dict]]:
+    """
+    여러 쿼리의 임베딩을 한 번의 API 호출로 만들고, 벡터 DB에서 한 번의 다중 벡터 쿼리로 관련 청크를 검색합니다.
+    쿼리별 결과를 입력 순서대로 반환하며, 각 단계의 캐시 적중 여부를 cache_hits의 같은 위치에 기록합니다.
+    """
+    query_embeddings = [None] * len(query_texts)
+    for i, query_text in enumerate(query_texts):
+        cached_embedding = query_embedding_cache.get(query_embedding_key(EMBEDDING_MODEL, query_text))
+        if cached_embedding is not None:
+            query_embeddings[i] = cached_embedding[0]
+            cache_hits[i]["query_embedding"] = True
+
+    missing_texts = list(dict.fromkeys(text for text, embedding in zip(query_texts, query_embeddings) if embedding is None))
+    if missing_texts:
+        logger.info(f"쿼리 {len(missing_texts)}개에 대한 임베딩 생성 시작.")
+        try:
+            new_embeddings = await get_embeddings(missing_texts)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"쿼리 임베딩 생성 중 오류 발생: {e}")
+        new_by_text = dict(zip(missing_texts, new_embeddings))
+        for text, embedding in new_by_text.items():
+            query_embedding_cache.set(query_embedding_key(EMBEDDING_MODEL, text), [embedding])
+        query_embeddings = [embedding if embedding is not None else new_by_text[text] for text, embedding in zip(query_texts, query_embeddings)]
+
+    search_keys = [retrieval_key(repo_name, embedding, n_results) for embedding in query_embeddings]
+    context_results = [retrieval_cache.get(key) for key in search_keys]
+    pending = [i for i, results in enumerate(context_results) if results is None]
+    for i, results in enumerate(context_results):
+        if results is not None:
+            cache_hits[i]["retrieval"] = True
+    if not pending:
+        return context_results
+
+    logger.info(f"벡터 DB에서 쿼리 {len(pending)}개의 관련 컨텍스트 검색 시작.")
+    pending_embeddings = [query_embeddings[i] for i in pending]
     try:
-        embeddings = await get_embeddings(all_chunk_contents)
+        if repo_name:
+            collection_name = get_repo_collection_name(repo_name)
+            collection_metadata = await get_collection_metadata(collection_name)
+            # 벡터 DB 컬렉션이 있으면 그쪽을 우선하고, 없을 때만 스냅샷으로 불러온 레포지토리를 스냅샷에서 검색
+            snapshot = snapshot_service.get_snapshot(repo_name) if collection_metadata is None else None
+            if snapshot is not None:
+                # 벡터 DB 대신 메모리 매핑된 임베딩 행렬에서 검색
+                _check_collection_embedding(repo_name, snapshot.manifest)
+                pending_results = await snapshot_service.query_snapshot_batch(repo_name, pending_embeddings, n_results=n_results)
+            else:
+                # 해당 레포지토리 컬렉션만 검색
+                _check_collection_embedding(repo_name, collection_metadata)
+                pending_results = await query_collection_batch(collection_name, pending_embeddings, n_results=n_results)
+        else:
+            # 현재 임베딩 모델로 만든 레포지토리 컬렉션과 스냅샷을 동시에 검색하고 거리 기준으로 합침
+            # (벡터 DB 컬렉션이 있는 레포지토리는 스냅샷을 불러왔더라도 컬렉션만 검색)
+            collections = await list_repo_collection_metadata()
+            live_repos = {metadata.get("repo_name") for metadata in collections.values()}
+            snapshots = {
+                name: manifest for name, manifest in snapshot_service.list_snapshots().items()
+                if collection_embedding_model(manifest) == EMBEDDING_MODEL and name not in live_repos
+            }
+            source_results = await asyncio.gather(
+                query_collections_batch(
+                    [
+                        name for name, metadata in collections.items()
+                        if collection_embedding_model(metadata) == EMBEDDING_MODEL
+                    ],
+                    pending_embeddings,
+                    n_results=n_results
+                ),
+                *(snapshot_service.query_snapshot_batch(name, pending_embeddings, n_results=n_results) for name in snapshots)
+            )
+            pending_results = [
+                sorted(
+                    (result for results in source_results for result in results[q]),
+                    key=lambda result: result["distance"]
+                )[:n_results]
+                for q in range(len(pending_embeddings))
+            ]
+        logger.info(f"벡터 DB에서 쿼리 {len(pending)}개의 컨텍스트 청크 검색 완료.")
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"임베딩 생성 중 오류 발생: {e}")
+        raise HTTPException(status_code=500, detail=f"벡터 DB 쿼리 중 오류 발생: {e}")
+    for i, results in zip(pending, pending_results):
+        retrieval_cache.set(search_keys[i], results)
+        context_results[i] = results
+    return context_results
+
+async def _search_vector(query_text: str, repo_name: str | None, n_results: int, cache_hit: dict) -> list[dict]:
+    """
+    쿼리 임베딩을 만들고 벡터 DB에서 관련 청크를 검색합니다. 각 단계의 캐시 적중 여부를 cache_hit에 기록합니다.
+    """
+    return (await _search_vector_batch([query_text], repo_name, n_results, [cache_hit]))[0]
 
-    logger.info(f"총 {len(embeddings)}개 임베딩 생성 완료. 벡터 DB 저장 시작.")
+async def _retrieve_context_batch(
+    query_texts: list[str],
+    repo_name: str | None,
+    n_results: int,
+    cache_hits: list[dict],
+    mode: str = "hybrid"
+) -> list[list[dict]]:
+    """
+    검색 모드에 따라 여러 쿼리의 관련 청크를 찾아 입력 순서대로 반환합니다.
+    hybrid 모드에서는 벡터 검색과 키워드 검색 결과를 순위 융합하며,
+    질문이 식별자 하나뿐이고 키워드 검색으로 찾았으면 그 질문은 임베딩/벡터 검색을 하지 않습니다.
+    벡터 검색이 필요한 쿼리들은 임베딩 API 호출과 벡터 DB 쿼리를 한 번씩만 합니다.
+    """
+    if mode == "vector":
+        return await _search_vector_batch(query_texts, repo_name, n_results, cache_hits)
+
+    search_keys = [retrieval_key(repo_name, query_text, n_results, mode) for query_text in query_texts]
+    context_results = [retrieval_cache.get(key) for key in search_keys]
+    pending = [i for i, results in enumerate(context_results) if results is None]
+    for i, results in enumerate(context_results):
+        if results is not None:
+            cache_hits[i]["retrieval"] = True
+    if not pending:
+        return context_results
 
-    # 벡터 DB에 저장 (비동기 함수이므로 await 사용)
     try:
-        await add_documents_to_collection(
-            CHROMA_COLLECTION_NAME,
-            all_chunk_contents,
-            all_chunk_metadatas,
-            embeddings,
-            all_chunk_ids
+        lexical_results = await asyncio.to_thread(
+            lambda: [lexical_index.search(query_texts[i], repo_name, n_results) for i in pending]
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"벡터 DB 저장 중 오류 발생: {e}")
+        raise HTTPException(status_code=500, detail=f"키워드 검색 중 오류 발생: {e}")
+    logger.info(f"키워드 검색으로 쿼리 {len(pending)}개의 컨텍스트 청크 검색 완료.")
 
+    vector_pending = [
+        position for position, i in enumerate(pending)
+        if mode == "hybrid" and not (lexical_results[position] and lexical_index.is_identifier_query(query_texts[i]))
+    ]
+    vector_results = await _search_vector_batch(
+        [query_texts[pending[position]] for position in vector_pending],
+        repo_name,
+        n_results,
+        [cache_hits[pending[position]] for position in vector_pending]
+    ) if vector_pending else []
+    fused_results = dict(zip(vector_pending, vector_results))
 
-    return {
-        "message": f"레포지토리 {repo_name} 처리, 청크 생성, 임베딩 및 벡터 DB 저장 완료",
-        "repo_path": str(local_repo_path),
-        "total_files": len(file_paths),
-        "total_chunks_processed": len(all_chunk_contents)
-        # "sample_chunks": all_chunks[:5] # 이제 샘플 청크는 응답으로 직접 보내지 않고, 벡터 DB에 저장
-    }
+    for position, i in enumerate(pending):
+        if position in fused_results:
+            context_results[i] = lexical_index.fuse_rankings([fused_results[position], lexical_results[position]], n_results)
+        else:
+            context_results[i] = lexical_results[position]
+        retrieval_cache.set(search_keys[i], context_results[i])
+    return context_results
+
+async def _retrieve_context(query_text: str, repo_name: str | None, n_results: int, cache_hit: dict, mode: str = "hybrid") -> list[dict]:
+    """
+    검색 모드에 따라 관련 청크를 찾습니다.
+    hybrid 모드에서는 벡터 검색과 키워드 검색 결과를 순위 융합하며,
+    질문이 식별자 하나뿐이고 키워드 검색으로 찾았으면 임베딩 API를 호출하지 않습니다.
+    """
+    return (await _retrieve_context_batch([query_text], repo_name, n_results, [cache_hit], mode))[0]
 
-# --- (추가 API: 벡터 DB에서 쿼리하는 엔드포인트) ---
 @app.post("/repo/query")
-async def query_repo(query_text: str, repo_name: str = None, n_results: int = 5):
+async def query_repo(query_text: str, repo_name: str = None, n_results: int = 10, mode: str = "hybrid"):
     """
     벡터 DB에 저장된 레포지토리 정보에 대해 질의하고 AI 답변을 반환합니다.
+    쿼리 임베딩 / 검색 결과 / AI 답변을 단계별로 캐시하며, 레포지토리가 재인덱싱되면 검색 결과 캐시는 무효화됩니다.
+    mode는 검색 방식입니다: vector(벡터 검색), lexical(키워드 검색), hybrid(두 결과를 순위 융합, 기본값).
+    검색된 청크는 같은 파일의 인접 청크를 합치고 중복을 제거한 뒤 토큰 예산(CONTEXT_TOKEN_BUDGET) 안에서만 사용합니다.
     """
     if not OPENAI_API_KEY:
         raise HTTPException(status_code=400, detail="OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 검색 모드입니다: {mode} (가능한 값: {', '.join(RETRIEVAL_MODES)})")
 
-    logger.info(f"쿼리 '{query_text}'에 대한 임베딩 생성 시작.")
-    try:
-        query_embedding = await get_embeddings([query_text])
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"쿼리 임베딩 생성 중 오류 발생: {e}")
+    cache_hit = {"query_embedding": False, "retrieval": False, "answer": False}
+    with track_stage("retrieve"):
+        context_results = await _retrieve_context(query_text, repo_name, n_results, cache_hit, mode)
+    # 겹치는 청크 병합, 중복 제거, 토큰 예산 내 패킹
+    context_results = build_context(context_results)
 
-    logger.info(f"벡터 DB에서 관련 컨텍스트 검색 시작 (쿼리: '{query_text}').")
-    where_clause = {}
-    if repo_name:
-        where_clause["repo_name"] = repo_name
+    response_key = answer_key(query_text, context_chunk_ids(context_results), LLM_MODEL)
+    ai_response = answer_cache.get(response_key)
+    if ai_response is not None:
+        cache_hit["answer"] = True
+    else:
+        logger.info(f"AI 모델을 사용하여 답변 생성 시작 (쿼리: '{query_text}').")
+        try:
+            ai_response = await generate_response_from_context(query_text, context_results)
+            logger.info("AI 답변 생성 완료.")
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            logger.error(f"AI 답변 생성 중 예상치 못한 오류 발생: {e}")
+            raise HTTPException(status_code=500, detail=f"AI 답변 생성 중 오류 발생: {e}")
+        answer_cache.set(response_key, ai_response)
 
-    try:
-        context_results = await query_collection(
-            CHROMA_COLLECTION_NAME,
-            query_embeddings=query_embedding,
-            n_results=n_results,
-            where=where_clause if where_clause else None
-        )
-        logger.info(f"벡터 DB에서 {len(context_results)}개 컨텍스트 청크 검색 완료.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"벡터 DB 쿼리 중 오류 발생: {e}")
+    return {
+        "message": "AI 답변",
+        "query": query_text,
+        "ai_response": ai_response,
+        "source_chunks_count": len(context_results),
+        "source_chunks": context_results,
+        "cache_hit": cache_hit
+    }
 
-    logger.info(f"AI 모델을 사용하여 답변 생성 시작 (쿼리: '{query_text}').")
-    try:
-        ai_response = await generate_response_from_context(query_text, context_results)
-        logger.info("AI 답변 생성 완료.")
+@app.post("/repo/query/batch")
+async def query_repo_batch(
+    queries: list[str] = Body(..., embed=True),
+    repo_name: str = None,
+    n_results: int = 10,
+    mode: str = "hybrid"
+):
+    """
+    여러 질문을 한 번에 처리합니다. 요청 본문은 {"queries": ["질문1", "질문2", ...]} 형식입니다.
+    벡터 검색이 필요한 질문들의 임베딩은 한 번의 API 호출로 만들고 벡터 DB도 한 번의 다중 벡터 쿼리로 검색하며,
+    AI 답변은 최대 BATCH_QUERY_CONCURRENCY개씩 동시에 생성합니다.
+    results에는 질문 순서대로 /repo/query와 같은 형식의 결과 또는 오류(error, status_code)가 들어갑니다.
+    검색 단계의 오류(임베딩 API 실패 등)는 모든 질문에 공통이므로 요청 전체의 오류로 반환합니다.
+    """
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=400, detail="OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 검색 모드입니다: {mode} (가능한 값: {', '.join(RETRIEVAL_MODES)})")
+    if not queries:
+        raise HTTPException(status_code=400, detail="질문이 없습니다.")
+    if len(queries) > BATCH_QUERY_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_QUERY_MAX_QUESTIONS}개의 질문만 처리할 수 있습니다.")
+
+    cache_hits = [{"query_embedding": False, "retrieval": False, "answer": False} for _ in queries]
+    with track_stage("retrieve"):
+        batch_results = await _retrieve_context_batch(queries, repo_name, n_results, cache_hits, mode)
+    # 겹치는 청크 병합, 중복 제거, 토큰 예산 내 패킹
+    contexts = [build_context(context_results) for context_results in batch_results]
+    response_keys = [
+        answer_key(query_text, context_chunk_ids(context_results), LLM_MODEL)
+        for query_text, context_results in zip(queries, contexts)
+    ]
+
+    semaphore = asyncio.Semaphore(BATCH_QUERY_CONCURRENCY)
+    # 같은 질문/컨텍스트가 여러 번 나오면 답변은 한 번만 생성
+    generations: dict[str, asyncio.Task] = {}
+
+    async def generate(query_text: str, context_results: list[dict], response_key: str) -> str:
+        async with semaphore:
+            logger.info(f"AI 모델을 사용하여 답변 생성 시작 (쿼리: '{query_text}').")
+            ai_response = await generate_response_from_context(query_text, context_results)
+        answer_cache.set(response_key, ai_response)
+        return ai_response
+
+    async def answer(i: int) -> dict:
+        query_text, context_results, response_key = queries[i], contexts[i], response_keys[i]
+        ai_response = answer_cache.get(response_key)
+        if ai_response is not None:
+            cache_hits[i]["answer"] = True
+        else:
+            if response_key not in generations:
+                generations[response_key] = asyncio.create_task(generate(query_text, context_results, response_key))
+            ai_response = await generations[response_key]
         return {
-            "message": "AI 답변",
             "query": query_text,
             "ai_response": ai_response,
             "source_chunks_count": len(context_results),
-            "source_chunks": context_results
+            "source_chunks": context_results,
+            "cache_hit": cache_hits[i]
         }
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        logger.error(f"AI 답변 생성 중 예상치 못한 오류 발생: {e}")
-        raise HTTPException(status_code=500, detail=f"AI 답변 생성 중 오류 발생: {e}")
\ No newline at end of file
+
+    try:
+        outcomes = await asyncio.gather(*(answer(i) for i in range(len(queries))), return_exceptions=True)
+    finally:
+        # 요청이 취소되면 진행 중인 답변 생성도 취소
+        for task in generations.values():
+            task.cancel()
+    results = []
+    for query_text, outcome in zip(queries, outcomes):
+        if isinstance(outcome, HTTPException):
+            results.append({"query": query_text, "error": outcome.detail, "status_code": outcome.status_code})
+        elif isinstance(outcome, Exception):
+            logger.error(f"AI 답변 생성 중 예상치 못한 오류 발생 (쿼리: '{query_text}'): {outcome}")
+            results.append({"query": query_text, "error": f"AI 답변 생성 중 오류 발생: {outcome}", "status_code": 500})
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results.append(outcome)
+    failed = sum(1 for result in results if "error" in result)
+    return {
+        "message": "AI 답변",
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }
+
+def _sse_event(event: str, data: dict) -> str:
+    """Server-Sent Events 형식의 메시지를 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/repo/query/stream")
+async def query_repo_stream(request: Request, query_text: str, repo_name: str = None, n_results: int = 10, mode: str = "hybrid"):
+    """
+    /repo/query와 같지만 Server-Sent Events로 응답합니다.
+    검색된 소스 청크를 먼저 보내고(event: sources), 이어서 AI 답변을 토큰 단위로 보냅니다(event: token).
+    클라이언트 연결이 끊기면 업스트림 AI 요청도 취소합니다.
+    """
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=400, detail="OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 검색 모드입니다: {mode} (가능한 값: {', '.join(RETRIEVAL_MODES)})")
+
+    cache_hit = {"query_embedding": False, "retrieval": False, "answer": False}
+    with track_stage("retrieve"):
+        context_results = await _retrieve_context(query_text, repo_name, n_results, cache_hit, mode)
+    # 겹치는 청크 병합, 중복 제거, 토큰 예산 내 패킹
+    context_results = build_context(context_results)
+    response_key = answer_key(query_text, context_chunk_ids(context_results), LLM_MODEL)
+
+    async def event_stream():
+        yield _sse_event("sources", {
+            "query": query_text,
+            "source_chunks_count": len(context_results),
+            "source_chunks": context_results
+        })
+
+        cached_response = answer_cache.get(response_key)
+        if cached_response is not None:
+            cache_hit["answer"] = True
+            yield _sse_event("token", {"text": cached_response})
+            yield _sse_event("done", {"cache_hit": cache_hit})
+            return
+
+        parts = []
+        tokens = stream_response_from_context(query_text, context_results)
+        try:
+            async for token in tokens:
+                if await request.is_disconnected():
+                    logger.info(f"클라이언트 연결 종료로 스트리밍 답변 생성을 중단합니다 (쿼리: '{query_text}').")
+                    return
+                parts.append(token)
+                yield _sse_event("token", {"text": token})
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"스트리밍 AI 답변 생성 중 예상치 못한 오류 발생: {e}")
+            yield _sse_event("error", {"detail": f"AI 답변 생성 중 오류 발생: {e}"})
+            return
+        finally:
+            # 중간에 끝나도 업스트림 스트림을 닫음
+            await tokens.aclose()
+
+        answer_cache.set(response_key, "".join(parts))
+        yield _sse_event("done", {"cache_hit": cache_hit})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
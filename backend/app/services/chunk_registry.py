@@ -0,0 +1,299 @@
+# backend/app/services/chunk_registry.py
+
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# 청크 메타데이터 저장소 SQLite 파일 경로 (모든 레포지토리가 함께 사용)
+# 벡터 DB와 키워드 검색 인덱스에는 청크 ID와 내용만 저장하고, 메타데이터는 여기서 조회합니다.
+CHUNK_REGISTRY_PATH = Path(os.getenv("CHUNK_REGISTRY_PATH", "./data/chunk_registry.sqlite3"))
+# SQLite 변수 개수 제한을 넘지 않도록 한 번에 조회/삭제할 ID 또는 파일 경로 수
+_BATCH_SIZE = 500
+
+_connection = None
+_lock = threading.Lock()
+# 문자열 -> 정수 ID 캐시 (레포 이름, 파일 경로, 언어, 심볼)
+_string_ids: Dict[str, int] = {}
+
+
+def _get_connection() -> sqlite3.Connection:
+    """메타데이터 저장소 DB 연결을 처음 사용할 때 열고 테이블을 준비합니다."""
+    global _connection
+    if _connection is None:
+        CHUNK_REGISTRY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(CHUNK_REGISTRY_PATH, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # 반복되는 문자열은 한 번만 저장하고 청크 행에는 정수 ID만 기록
+        connection.execute("CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " repo_id INTEGER NOT NULL,"
+            " file_id INTEGER NOT NULL,"
+            " language_id INTEGER NOT NULL,"
+            " symbol_id INTEGER NOT NULL,"
+            " chunk_index INTEGER NOT NULL,"
+            " start_char INTEGER NOT NULL,"
+            " end_char INTEGER NOT NULL,"
+            " start_line INTEGER NOT NULL,"
+            " end_line INTEGER NOT NULL,"
+            " content_hash BLOB NOT NULL,"
+            " index_run_id INTEGER NOT NULL," # 마지막으로 이 청크를 저장한 인덱싱 실행
+            " created_run_id INTEGER NOT NULL" # 이 청크를 처음 만든 인덱싱 실행
+            ") WITHOUT ROWID"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_chunks_repo_file ON chunks(repo_id, file_id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_chunks_repo_run ON chunks(repo_id, index_run_id)")
+        # 레포별 마지막 인덱싱 실행 번호 (실행 ID는 레포마다 1부터 증가하는 정수이므로 문자열 테이블에 쌓이지 않음)
+        connection.execute("CREATE TABLE IF NOT EXISTS runs (repo_id INTEGER PRIMARY KEY, last_run INTEGER NOT NULL)")
+        connection.commit()
+        _connection = connection
+        logger.info(f"청크 메타데이터 저장소 {CHUNK_REGISTRY_PATH} 열기 완료.")
+    return _connection
+
+def _intern(connection: sqlite3.Connection, value: str) -> int:
+    """문자열의 정수 ID를 반환합니다. 처음 보는 문자열이면 새로 등록합니다."""
+    string_id = _string_ids.get(value)
+    if string_id is None:
+        connection.execute("INSERT OR IGNORE INTO strings (value) VALUES (?)", (value,))
+        string_id = connection.execute("SELECT id FROM strings WHERE value = ?", (value,)).fetchone()[0]
+        _string_ids[value] = string_id
+    return string_id
+
+def _lookup(connection: sqlite3.Connection, value: str) -> int | None:
+    """등록된 문자열의 정수 ID를 반환합니다. 없으면 None을 반환합니다 (새로 등록하지 않음)."""
+    string_id = _string_ids.get(value)
+    if string_id is None:
+        row = connection.execute("SELECT id FROM strings WHERE value = ?", (value,)).fetchone()
+        if row is None:
+            return None
+        string_id = _string_ids[value] = row[0]
+    return string_id
+
+def make_chunk_id(repo_name: str, file_path: str, chunk_index: int, content_hash: str) -> str:
+    """
+    (레포 이름, 파일 경로, 청크 순번, 내용 해시)로 청크 ID를 만듭니다.
+    같은 청크는 다시 인덱싱해도 같은 ID가 되므로 저장이 덮어쓰기(upsert)가 됩니다.
+    """
+    key = f"{repo_name}\0{file_path}\0{chunk_index}\0{content_hash}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def start_run(repo_name: str) -> int:
+    """레포지토리의 새 인덱싱 실행 ID(레포별로 증가하는 정수)를 발급합니다."""
+    with _lock:
+        connection = _get_connection()
+        repo_id = _intern(connection, repo_name)
+        connection.execute(
+            "INSERT INTO runs VALUES (?, 1) ON CONFLICT(repo_id) DO UPDATE SET last_run = last_run + 1", (repo_id,)
+        )
+        run_id = connection.execute("SELECT last_run FROM runs WHERE repo_id = ?", (repo_id,)).fetchone()[0]
+        connection.commit()
+    return run_id
+
+def upsert_chunks(repo_name: str, ids: list[str], metadatas: List[Dict[str, Any]], run_id: int):
+    """
+    청크 메타데이터를 저장합니다. 이미 있는 ID는 처음 만든 실행(created_run_id)을 유지하고 나머지를 갱신합니다.
+    (내용이 같은 청크도 파일 안에서 위치가 바뀌면 글자/줄 위치와 심볼이 달라지므로 함께 갱신)
+    """
+    with _lock:
+        connection = _get_connection()
+        repo_id = _intern(connection, repo_name)
+        rows = [
+            (
+                chunk_id,
+                repo_id,
+                _intern(connection, metadata["file_path"]),
+                _intern(connection, metadata.get("language", "")),
+                _intern(connection, metadata.get("symbol", "")),
+                metadata["chunk_index"],
+                metadata["start_char"],
+                metadata["end_char"],
+                metadata.get("start_line", 0),
+                metadata.get("end_line", 0),
+                bytes.fromhex(metadata["content_hash"]),
+                run_id,
+                run_id
+            )
+            for chunk_id, metadata in zip(ids, metadatas)
+        ]
+        connection.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(chunk_id) DO UPDATE SET"
+            " language_id = excluded.language_id, symbol_id = excluded.symbol_id,"
+            " start_char = excluded.start_char, end_char = excluded.end_char,"
+            " start_line = excluded.start_line, end_line = excluded.end_line,"
+            " index_run_id = excluded.index_run_id",
+            rows
+        )
+        connection.commit()
+
+def get_metadatas(ids: list[str]) -> Dict[str, Dict[str, Any]]:
+    """청크 ID별 메타데이터를 조회합니다. 저장소에 없는 ID는 결과에 포함되지 않습니다."""
+    metadatas = {}
+    with _lock:
+        connection = _get_connection()
+        for i in range(0, len(ids), _BATCH_SIZE):
+            batch = ids[i:i + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(
+                "SELECT c.chunk_id, repo.value, file.value, language.value, symbol.value,"
+                " c.chunk_index, c.start_char, c.end_char, c.start_line, c.end_line, c.content_hash, c.index_run_id"
+                " FROM chunks c"
+                " JOIN strings repo ON repo.id = c.repo_id"
+                " JOIN strings file ON file.id = c.file_id"
+                " JOIN strings language ON language.id = c.language_id"
+                " JOIN strings symbol ON symbol.id = c.symbol_id"
+                f" WHERE c.chunk_id IN ({placeholders})",
+                batch
+            ).fetchall()
+            for (chunk_id, repo_name, file_path, language, symbol, chunk_index,
+                 start_char, end_char, start_line, end_line, content_hash, run_id) in rows:
+                metadatas[chunk_id] = {
+                    "file_path": file_path,
+                    "repo_name": repo_name,
+                    "language": language,
+                    "chunk_index": chunk_index,
+                    "start_char": start_char,
+                    "end_char": end_char,
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "symbol": symbol,
+                    "content_hash": content_hash.hex(),
+                    "index_run": run_id,
+                }
+    return metadatas
+
+def hydrate_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    검색 결과의 metadata를 저장소의 메타데이터로 채웁니다.
+    저장소에 없는 청크(이전 방식으로 메타데이터를 벡터 DB에 함께 저장한 청크)는 원래 값을 그대로 둡니다.
+    """
+    if not results:
+        return results
+    metadatas = get_metadatas([result["id"] for result in results])
+    for result in results:
+        metadata = metadatas.get(result["id"])
+        if metadata is not None:
+            result["metadata"] = metadata
+        elif result.get("metadata") is None:
+            result["metadata"] = {}
+    return results
+
+def run_chunk_ids(repo_name: str, run_id: int) -> set[str]:
+    """이번 인덱싱 실행(run_id)에서 저장한 청크 ID 집합을 반환합니다."""
+    with _lock:
+        connection = _get_connection()
+        repo_id = _lookup(connection, repo_name)
+        if repo_id is None:
+            return set()
+        rows = connection.execute(
+            "SELECT chunk_id FROM chunks WHERE repo_id = ? AND index_run_id = ?", (repo_id, run_id)
+        ).fetchall()
+    return {row[0] for row in rows}
+
+def created_chunk_ids(repo_name: str, run_id: int) -> list[str]:
+    """
+    이번 인덱싱 실행(run_id)에서 처음 만든 청크 ID 목록을 반환합니다.
+    실행이 실패했을 때 되돌릴 대상이며, 이전부터 있던 청크(같은 ID로 다시 저장된 청크)는 포함되지 않습니다.
+    """
+    with _lock:
+        connection = _get_connection()
+        repo_id = _lookup(connection, repo_name)
+        if repo_id is None:
+            return []
+        rows = connection.execute(
+            "SELECT chunk_id FROM chunks WHERE repo_id = ? AND created_run_id = ?", (repo_id, run_id)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+def retain_file_chunks(repo_name: str, run_id: int, paths: set[str]):
+    """
+    해당 파일들의 기존 청크를 이번 인덱싱 실행(run_id)에서 저장한 것으로 표시하여 정리 대상에서 제외합니다.
+    다시 청크를 만들지 못한 파일(청크 수 제한으로 건너뛴 파일 등)의 이전 청크를 유지할 때 사용합니다.
+    """
+    with _lock:
+        connection = _get_connection()
+        repo_id = _lookup(connection, repo_name)
+        if repo_id is None:
+            return
+        file_ids = [file_id for file_id in (_lookup(connection, path) for path in sorted(paths)) if file_id is not None]
+        for i in range(0, len(file_ids), _BATCH_SIZE):
+            batch = file_ids[i:i + _BATCH_SIZE]
+            connection.execute(
+                f"UPDATE chunks SET index_run_id = ? WHERE repo_id = ? AND file_id IN ({','.join('?' * len(batch))})",
+                [run_id, repo_id, *batch]
+            )
+        connection.commit()
+
+def stale_chunk_ids(repo_name: str, run_id: int, stale_paths: set[str] = None) -> list[str]:
+    """
+    이번 인덱싱 실행(run_id)에서 저장하지 않은 청크 ID 목록을 반환합니다.
+    stale_paths가 None이면 레포 전체, 아니면 해당 파일들의 청크만 대상입니다.
+    """
+    with _lock:
+        connection = _get_connection()
+        repo_id = _lookup(connection, repo_name)
+        if repo_id is None:
+            return []
+        if stale_paths is None:
+            rows = connection.execute(
+                "SELECT chunk_id FROM chunks WHERE repo_id = ? AND index_run_id != ?", (repo_id, run_id)
+            ).fetchall()
+        else:
+            file_ids = [file_id for file_id in (_lookup(connection, path) for path in sorted(stale_paths)) if file_id is not None]
+            rows = []
+            for i in range(0, len(file_ids), _BATCH_SIZE):
+                batch = file_ids[i:i + _BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(connection.execute(
+                    f"SELECT chunk_id FROM chunks WHERE repo_id = ? AND index_run_id != ? AND file_id IN ({placeholders})",
+                    [repo_id, run_id, *batch]
+                ).fetchall())
+    return [row[0] for row in rows]
+
+def delete_chunks(ids: list[str]):
+    """청크 메타데이터를 삭제합니다."""
+    with _lock:
+        connection = _get_connection()
+        for i in range(0, len(ids), _BATCH_SIZE):
+            batch = ids[i:i + _BATCH_SIZE]
+            connection.execute(f"DELETE FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch)
+        connection.commit()
+
+def has_repo_chunks(repo_name: str) -> bool:
+    """레포지토리 청크 메타데이터가 하나라도 있는지 확인합니다."""
+    with _lock:
+        connection = _get_connection()
+        repo_id = _lookup(connection, repo_name)
+        if repo_id is None:
+            return False
+        row = connection.execute("SELECT 1 FROM chunks WHERE repo_id = ? LIMIT 1", (repo_id,)).fetchone()
+    return row is not None
+
+def drop_repo(repo_name: str) -> bool:
+    """
+    레포지토리의 모든 청크 메타데이터를 삭제하고, 더 이상 쓰이지 않는 문자열을 정리합니다.
+    삭제한 청크가 있었으면 True를 반환합니다.
+    """
+    with _lock:
+        connection = _get_connection()
+        repo_id = _lookup(connection, repo_name)
+        if repo_id is None:
+            return False
+        deleted = connection.execute("DELETE FROM chunks WHERE repo_id = ?", (repo_id,)).rowcount
+        connection.execute("DELETE FROM runs WHERE repo_id = ?", (repo_id,))
+        connection.execute(
+            "DELETE FROM strings WHERE id NOT IN ("
+            " SELECT repo_id FROM chunks UNION SELECT file_id FROM chunks UNION SELECT language_id FROM chunks"
+            " UNION SELECT symbol_id FROM chunks)"
+        )
+        connection.commit()
+        _string_ids.clear()
+    return deleted > 0
@@ -1,12 +1,67 @@
+import os
+import ast
+import re
 import logging
+from bisect import bisect_right
+from collections import Counter
 from pathlib import Path
 
+from app.services.github_service import decode_text
+
 logger = logging.getLogger(__name__)
 
-#청크가 포함할 최대 글자 수~
-CHUNK_SIZE = 1000
-#청크 간의 겹치는 부분이요~
-CHUNK_OVERLAP = 200
+#청크가 포함할 최대 글자 수~ (이보다 큰 함수/클래스/섹션은 내부 구조 또는 줄 단위로 다시 나눔)
+CHUNK_SIZE = 2000
+#이보다 작은 청크는 이웃 청크와 합침 (합친 크기가 CHUNK_SIZE를 넘지 않는 경우)
+MIN_CHUNK_SIZE = 400
+
+# 파일 하나에서 만들 최대 청크 수 (넘으면 파일 전체에 고르게 퍼지도록 골라냄)
+MAX_CHUNKS_PER_FILE = int(os.getenv("MAX_CHUNKS_PER_FILE", "200"))
+# 요약 방식(JSON 키 스키마, 선언 목록, 구간 샘플)으로 인덱싱하는 파일 하나에서 만들 최대 청크 수
+SUMMARY_CHUNKS_PER_FILE = int(os.getenv("SUMMARY_CHUNKS_PER_FILE", "8"))
+# 압축(minified) 판단: 앞부분 샘플의 평균 줄 길이가 이 값을 넘으면 압축된 파일로 봄
+MINIFIED_AVG_LINE_LENGTH = 500
+# 생성/압축 여부를 판단할 때 보는 파일 앞부분 크기 (글자 수)
+DETECTION_SAMPLE_SIZE = 64 * 1024
+# JSON 키 스키마 요약에서 집계할 서로 다른 키의 최대 개수 (ID를 키로 쓰는 파일 등에서 메모리가 커지지 않도록)
+JSON_SCHEMA_MAX_KEYS = 10000
+
+# 중괄호로 블록을 구분하는 언어
+BRACE_LANGUAGES = {'java', 'javascript/typescript', 'c/cpp', 'go', 'rust'}
+# 중괄호 언어에서 심볼 이름을 추출하기 위한 정규식
+_DECLARATION_PATTERN = re.compile(r'\b(class|interface|enum|struct|impl|trait|fn|func|function|type)\s+([A-Za-z_$][\w$]*)')
+_METHOD_PATTERN = re.compile(r'^\s*(?:[\w<>\[\],.?*&]+\s+)+\**([A-Za-z_$][\w$]*)\s*\([^;]*$')
+_MARKDOWN_HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*)')
+# 자동 생성 파일 머리말: 파일 맨 앞 주석 줄(최대 GENERATED_HEADER_LINES줄)에서만 찾음
+# - Go 규칙: "// Code generated ... DO NOT EDIT."
+# - "@generated" 표시 (Facebook/Meta 도구, protobuf 등)
+# - 한 주석 줄에 "generated"와 "do not edit"이 함께 있는 경우 (예: "# Generated by the protocol buffer compiler.  DO NOT EDIT!")
+GENERATED_HEADER_LINES = 5
+_COMMENT_LINE_PATTERN = re.compile(r'^\s*(?:#|//|/\*|\*|--|;|<!--)')
+_GENERATED_HEADER_PATTERNS = (
+    re.compile(r'^// Code generated .* DO NOT EDIT\.$'),
+    re.compile(r'@generated\b'),
+    re.compile(r'\bgenerated\b.*\bdo not edit\b', re.IGNORECASE),
+)
+# 큰 파일을 메모리 매핑으로 훑을 때 쓰는 바이트 정규식 (선언/제목 줄, JSON 키)
+_OUTLINE_PATTERNS = {
+    'python': re.compile(rb'^[ \t]*(?:async[ \t]+)?(?:def|class)[ \t]+\w+[^\n]{0,200}', re.MULTILINE),
+    'markdown': re.compile(rb'^#{1,6}[ \t]+[^\n]{1,200}', re.MULTILINE),
+}
+_BRACE_OUTLINE_PATTERN = re.compile(
+    rb'^[^\n]{0,80}?\b(?:class|interface|enum|struct|impl|trait|fn|func|function|type)[ \t]+[A-Za-z_$][\w$]*[^\n]{0,200}',
+    re.MULTILINE
+)
+_JSON_KEY_PATTERN = re.compile(rb'"([^"\\\n]{1,100})"[ \t\r\n]*:')
+# UTF-8 연속 바이트(0x80-0xBF)가 아닌 바이트 (바이트 위치를 글자 위치로 바꿀 때 연속 바이트만 남겨 셈)
+_NON_CONTINUATION_BYTES = bytes(value for value in range(256) if not 0x80 <= value <= 0xBF)
+
+# 요약 청크의 심볼 (원본 구간을 그대로 담은 청크가 아니므로 컨텍스트 병합 등에서 따로 다룸)
+SUMMARY_SYMBOL_JSON_HEAD = "<json-head>"
+SUMMARY_SYMBOL_JSON_SCHEMA = "<json-schema>"
+SUMMARY_SYMBOL_OUTLINE = "<outline>"
+SUMMARY_SYMBOL_SAMPLE = "<sample>"
+SUMMARY_SYMBOLS = {SUMMARY_SYMBOL_JSON_HEAD, SUMMARY_SYMBOL_JSON_SCHEMA, SUMMARY_SYMBOL_OUTLINE, SUMMARY_SYMBOL_SAMPLE}
 
 def get_file_language(file_path: Path) -> str:
     """파일 확장자를 기반으로 언어를 추정합니다."""
@@ -32,47 +87,543 @@ def get_file_language(file_path: Path) -> str:
     else:
         return 'unknown' # 또는 'text'
 
-def chunk_text(text: str, file_path: Path, repo_name: str) -> list[dict]:
+def _python_segments(text: str, lines: list[str]) -> list[tuple[int, int, str]]:
     """
-    주어진 텍스트를 청크로 분할하고 메타데이터를 추가합니다.
-    (간단한 글자 수 기반 청크 분할)
+    stdlib ast로 파이썬 파일을 최상위 함수/클래스 단위로 나눕니다.
+    (시작 줄 인덱스, 끝 줄 인덱스(미포함), 심볼) 리스트를 반환합니다. 줄 인덱스는 0부터 시작합니다.
+    너무 큰 클래스는 메서드 단위로 다시 나눕니다.
     """
-    chunks = []
-    text_len = len(text)
-    start_idx = 0
-    chunk_num = 0
+    tree = ast.parse(text)
+    segments = []
+    _collect_python_segments(tree.body, 0, len(lines), lines, "", segments)
+    return segments
+
+def _collect_python_segments(nodes: list, start: int, end: int, lines: list[str], prefix: str, segments: list):
+    """
+    nodes(같은 블록의 문장들)를 구간으로 나눕니다.
+    함수/클래스는 각각 하나의 구간이 되고, 그 사이의 import/대입 등은 하나로 묶입니다.
+    정의 앞의 주석/빈 줄은 다음 정의에 붙입니다.
+    """
+    cursor = start
+    pending_start = None # 함수/클래스가 아닌 문장이 모여 있는 구간의 시작
+    for node in nodes:
+        node_end = node.end_lineno
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if pending_start is not None:
+                segments.append((pending_start, cursor, prefix.rstrip('.')))
+                pending_start = None
+            kind = 'class' if isinstance(node, ast.ClassDef) else 'def'
+            symbol = f"{kind} {prefix}{node.name}"
+            size = sum(len(line) for line in lines[cursor:node_end])
+            if isinstance(node, ast.ClassDef) and size > CHUNK_SIZE and node.body:
+                # 큰 클래스: 클래스 선언부 + 메서드별 구간
+                body_start = min([node.body[0].lineno] + [d.lineno for d in getattr(node.body[0], 'decorator_list', [])]) - 1
+                segments.append((cursor, body_start, symbol))
+                _collect_python_segments(node.body, body_start, node_end, lines, f"{prefix}{node.name}.", segments)
+            else:
+                segments.append((cursor, node_end, symbol))
+        else:
+            if pending_start is None:
+                pending_start = cursor
+        cursor = max(cursor, node_end)
+    if pending_start is not None or cursor < end:
+        segments.append((pending_start if pending_start is not None else cursor, end, prefix.rstrip('.')))
+
+def _strip_code_line(line: str, state: dict) -> str:
+    """
+    문자열 리터럴과 주석을 제거한 코드만 반환합니다 (중괄호 깊이 계산용 간단한 토크나이저).
+    여러 줄에 걸친 블록 주석 / 템플릿 문자열 상태는 state에 유지합니다.
+    """
+    result = []
+    i = 0
+    n = len(line)
+    while i < n:
+        ch = line[i]
+        if state.get("block_comment"):
+            if line.startswith('*/', i):
+                state["block_comment"] = False
+                i += 2
+            else:
+                i += 1
+            continue
+        if state.get("string"):
+            quote = state["string"]
+            if ch == '\\':
+                i += 2
+                continue
+            if ch == quote:
+                state["string"] = None
+            elif quote != '`' and ch == '\n':
+                state["string"] = None
+            i += 1
+            continue
+        if line.startswith('//', i):
+            break
+        if line.startswith('/*', i):
+            state["block_comment"] = True
+            i += 2
+            continue
+        if ch in ('"', "'", '`'):
+            state["string"] = ch
+            i += 1
+            continue
+        result.append(ch)
+        i += 1
+    # 백틱이 아닌 문자열은 줄을 넘지 않는다고 가정
+    if state.get("string") in ('"', "'"):
+        state["string"] = None
+    return ''.join(result)
+
+def _brace_segments(lines: list[str], start: int, end: int, base_depth: int = 0) -> list[tuple[int, int, str]]:
+    """
+    중괄호 깊이를 따라 블록 단위로 나눕니다.
+    깊이가 base_depth로 돌아오는 지점(블록이 닫히거나 문장이 끝나는 곳)과
+    base_depth에서의 빈 줄을 경계로 삼습니다.
+    """
+    segments = []
+    state = {}
+    depth = 0
+    segment_start = None
+    for i in range(start, end):
+        line = lines[i]
+        code = _strip_code_line(line, state)
+        depth_before = depth
+        depth = max(0, depth + code.count('{') - code.count('}'))
+        if segment_start is None:
+            if not line.strip():
+                continue
+            segment_start = i
+        stripped = code.strip()
+        if depth <= base_depth and not state.get("block_comment"):
+            closes_block = depth_before > base_depth
+            # 바깥 블록을 여는 줄 (예: 클래스 선언부)은 첫 멤버와 분리
+            opens_outer_block = depth_before < depth == base_depth
+            ends_statement = stripped.endswith(';') or stripped.endswith('}')
+            blank_line = not line.strip()
+            if closes_block or opens_outer_block or (depth_before <= base_depth and (ends_statement or blank_line)):
+                segments.append((segment_start, i + 1, _brace_symbol(lines, segment_start, i + 1)))
+                segment_start = None
+    if segment_start is not None:
+        segments.append((segment_start, end, _brace_symbol(lines, segment_start, end)))
+    return segments
+
+def _brace_symbol(lines: list[str], start: int, end: int) -> str:
+    """구간 안에서 처음 나오는 선언(클래스/함수 등)의 이름을 찾습니다."""
+    for line in lines[start:min(end, start + 20)]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith(('//', '/*', '*', '@', '#')):
+            continue
+        match = _DECLARATION_PATTERN.search(stripped)
+        if match:
+            return f"{match.group(1)} {match.group(2)}"
+        match = _METHOD_PATTERN.match(stripped)
+        if match and match.group(1) not in ('if', 'for', 'while', 'switch', 'return', 'catch'):
+            return match.group(1)
+    return ""
+
+def _markdown_segments(lines: list[str]) -> list[tuple[int, int, str]]:
+    """마크다운 문서를 제목(#) 단위 섹션으로 나눕니다. 코드 블록 안의 #은 무시합니다."""
+    segments = []
+    segment_start = 0
+    title = ""
+    in_code_block = False
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith('```'):
+            in_code_block = not in_code_block
+            continue
+        if in_code_block:
+            continue
+        match = _MARKDOWN_HEADING_PATTERN.match(line)
+        if match and i > segment_start:
+            segments.append((segment_start, i, title))
+            segment_start = i
+        if match:
+            title = match.group(2).strip()
+    segments.append((segment_start, len(lines), title))
+    return segments
+
+def _indent_segments(lines: list[str]) -> list[tuple[int, int, str]]:
+    """
+    들여쓰기 기반 휴리스틱: 들여쓰기 없는 줄에서 시작하는 블록 단위로 나눕니다.
+    (문법 오류가 있는 파이썬 파일 등에 사용)
+    """
+    segments = []
+    segment_start = 0
+    for i, line in enumerate(lines):
+        if i > segment_start and line.strip() and not line[0].isspace() and not lines[i - 1].rstrip().endswith(('\\', ',', '(')):
+            if line.lstrip().startswith(('def ', 'class ', 'async def ', '@')):
+                segments.append((segment_start, i, ""))
+                segment_start = i
+    segments.append((segment_start, len(lines), ""))
+    return segments
 
+def _structure_segments(text: str, lines: list[str], language: str) -> list[tuple[int, int, str]]:
+    """언어에 맞는 방식으로 구조 단위 구간을 계산합니다. 구조를 알 수 없으면 파일 전체를 하나의 구간으로 둡니다."""
+    if language == 'python':
+        try:
+            return _python_segments(text, lines)
+        except (SyntaxError, ValueError) as e:
+            logger.debug(f"파이썬 AST 파싱 실패, 들여쓰기 휴리스틱 사용: {e}")
+            return _indent_segments(lines)
+    if language in BRACE_LANGUAGES:
+        return _brace_segments(lines, 0, len(lines))
+    if language == 'markdown':
+        return _markdown_segments(lines)
+    return [(0, len(lines), "")]
+
+def _split_oversized(lines: list[str], segment: tuple[int, int, str], language: str) -> list[tuple[int, int, str]]:
+    """
+    너무 큰 구간을 나눕니다. 중괄호 언어는 한 단계 안쪽 블록 기준으로 먼저 나누고,
+    그래도 크면 CHUNK_SIZE 이하의 줄 묶음으로 나눕니다.
+    """
+    start, end, symbol = segment
+    if sum(len(line) for line in lines[start:end]) <= CHUNK_SIZE:
+        return [segment]
+
+    if language in BRACE_LANGUAGES and end - start > 2:
+        inner = _brace_segments(lines, start, end, base_depth=1)
+        if len(inner) > 1:
+            result = []
+            for inner_start, inner_end, inner_symbol in inner:
+                if symbol and inner_symbol and inner_symbol != symbol:
+                    name = f"{symbol}.{inner_symbol}"
+                else:
+                    name = inner_symbol or symbol
+                result.extend(_split_by_lines(lines, inner_start, inner_end, name))
+            return result
+    return _split_by_lines(lines, start, end, symbol)
+
+def _split_by_lines(lines: list[str], start: int, end: int, symbol: str) -> list[tuple[int, int, str]]:
+    """구간을 CHUNK_SIZE 이하의 줄 묶음으로 나눕니다."""
+    result = []
+    piece_start = start
+    piece_size = 0
+    for i in range(start, end):
+        if piece_size and piece_size + len(lines[i]) > CHUNK_SIZE:
+            result.append((piece_start, i, symbol))
+            piece_start = i
+            piece_size = 0
+        piece_size += len(lines[i])
+    if piece_start < end:
+        result.append((piece_start, end, symbol))
+    return result
+
+def _merge_small(lines: list[str], segments: list[tuple[int, int, str]]) -> list[tuple[int, int, str]]:
+    """작은 인접 구간을 합쳐 청크 수를 줄입니다."""
+    merged = []
+    sizes = []
+    for segment in segments:
+        size = sum(len(line) for line in lines[segment[0]:segment[1]])
+        if merged and (size < MIN_CHUNK_SIZE or sizes[-1] < MIN_CHUNK_SIZE) and sizes[-1] + size <= CHUNK_SIZE:
+            prev_start, _, prev_symbol = merged[-1]
+            symbols = [symbol for symbol in prev_symbol.split(", ") + [segment[2]] if symbol]
+            merged[-1] = (prev_start, segment[1], ", ".join(dict.fromkeys(symbols)))
+            sizes[-1] += size
+        else:
+            merged.append(segment)
+            sizes.append(size)
+    return merged
+
+def chunk_text(text: str, file_path: Path, repo_name: str, repo_root: Path = None) -> list[dict]:
+    """
+    주어진 텍스트를 언어 구조(함수/클래스/섹션) 단위 청크로 분할하고 메타데이터를 추가합니다.
+    - 파이썬: stdlib ast로 최상위 함수/클래스 단위 (큰 클래스는 메서드 단위)
+    - 중괄호 언어(Java, JS/TS, C/C++, Go, Rust): 중괄호 깊이 기반 블록 단위
+    - 마크다운: 제목 단위 섹션
+    - 그 외: 줄 단위 묶음
+    큰 구간은 나누고 작은 구간은 합치며, 실제 줄 번호(1부터 시작)를 기록합니다.
+    청크가 MAX_CHUNKS_PER_FILE개를 넘으면 파일 전체에 고르게 퍼지도록 그만큼만 남깁니다.
+    repo_root가 주어지면 file_path 메타데이터를 레포 루트 기준 상대 경로로 기록합니다.
+    """
     language = get_file_language(file_path)
+    relative_file_path = _relative_file_path(file_path, repo_root)
+
+    lines = text.splitlines(keepends=True)
+    if not lines:
+        return []
+    # 줄 인덱스 -> 문자 오프셋
+    line_offsets = [0]
+    for line in lines:
+        line_offsets.append(line_offsets[-1] + len(line))
 
-    while start_idx < text_len:
-        end_idx = min(start_idx + CHUNK_SIZE, text_len)
-        chunk_content = text[start_idx:end_idx]
-
-        # 줄 번호 정보는 정확히 계산하기 어려우므로, 간단히 0으로 표기하거나 생략
-        # AST 파싱을 통해 정확한 줄 번호를 얻을 수 있지만, 여기서는 간단히 처리
-        start_line = 0 # Placeholder for now
-        end_line = 0   # Placeholder for now
-
-        metadata = {
-            "file_path": str(file_path.relative_to(file_path.parts[0])), # 레포 루트 기준 상대 경로
-            "repo_name": repo_name,
-            "language": language,
-            "chunk_index": chunk_num,
-            "start_char": start_idx,
-            "end_char": end_idx,
-            "start_line": start_line, # 추후 개선 필요
-            "end_line": end_line,     # 추후 개선 필요
-            # "git_commit_info": "..." # Git 정보도 추가 가능
+    segments = []
+    for segment in _structure_segments(text, lines, language):
+        if segment[0] < segment[1]:
+            segments.extend(_split_oversized(lines, segment, language))
+    segments = _merge_small(lines, segments)
+
+    chunks = []
+    for start, end, symbol in segments:
+        start_char = line_offsets[start]
+        end_char = line_offsets[end]
+        # 한 줄이 CHUNK_SIZE보다 긴 경우(압축된 코드 등)는 글자 수 기준으로 자름
+        for piece_start in range(start_char, end_char, CHUNK_SIZE):
+            piece_end = min(piece_start + CHUNK_SIZE, end_char)
+            chunk_content = text[piece_start:piece_end]
+            if not chunk_content.strip():
+                continue
+
+            metadata = {
+                "file_path": relative_file_path, # 레포 루트 기준 상대 경로
+                "repo_name": repo_name,
+                "language": language,
+                "chunk_index": len(chunks),
+                "start_char": piece_start,
+                "end_char": piece_end,
+                "start_line": bisect_right(line_offsets, piece_start),
+                "end_line": bisect_right(line_offsets, piece_end - 1),
+                "symbol": symbol, # 청크에 포함된 함수/클래스/섹션 이름
+                # "git_commit_info": "..." # Git 정보도 추가 가능
+            }
+
+            chunks.append({
+                "content": chunk_content,
+                "metadata": metadata
+            })
+
+    return _apply_chunk_budget(chunks, MAX_CHUNKS_PER_FILE)
+
+def _apply_chunk_budget(chunks: list[dict], budget: int) -> list[dict]:
+    """청크가 budget개를 넘으면 파일 전체에 고르게 퍼지도록 budget개만 골라 chunk_index를 다시 매깁니다."""
+    if budget <= 0 or len(chunks) <= budget:
+        return chunks
+    step = len(chunks) / budget
+    selected = [chunks[int(i * step)] for i in range(budget)]
+    for i, chunk in enumerate(selected):
+        chunk["metadata"]["chunk_index"] = i
+    logger.info(f"파일 청크 수 제한({budget}개) 초과: {selected[0]['metadata']['file_path']} ({len(chunks)}개 중 {budget}개 사용)")
+    return selected
+
+def _has_generated_header(text: str) -> bool:
+    """
+    파일 맨 앞의 주석 줄(빈 줄은 건너뜀)에 자동 생성 머리말이 있는지 확인합니다.
+    코드가 처음 나오면 멈추므로, 본문이나 문서 중간에서 "do not edit" 같은 문구를 언급한 파일은 해당하지 않습니다.
+    """
+    comment_lines = 0
+    for line in text[:4096].splitlines():
+        if not line.strip():
+            continue
+        if not _COMMENT_LINE_PATTERN.match(line):
+            return False
+        if any(pattern.search(line.rstrip()) for pattern in _GENERATED_HEADER_PATTERNS):
+            return True
+        comment_lines += 1
+        if comment_lines >= GENERATED_HEADER_LINES:
+            return False
+    return False
+
+def detect_generated(text: str) -> str | None:
+    """
+    파일 앞부분을 보고 압축(minified) 또는 자동 생성된 파일인지 판단합니다.
+    "minified" / "generated" / None을 반환합니다.
+    """
+    sample = text[:DETECTION_SAMPLE_SIZE]
+    if _has_generated_header(sample):
+        return "generated"
+    # 짧은 파일은 한 줄짜리여도 청크 수가 적으므로 그대로 둠
+    if len(sample) > CHUNK_SIZE * 2 and len(sample) / (sample.count('\n') + 1) > MINIFIED_AVG_LINE_LENGTH:
+        return "minified"
+    return None
+
+def _relative_file_path(file_path: Path, repo_root: Path = None) -> str:
+    """메타데이터에 기록할 파일 경로 (repo_root가 주어지면 레포 루트 기준 상대 경로)"""
+    if repo_root is not None:
+        return file_path.relative_to(repo_root).as_posix()
+    return str(file_path.relative_to(file_path.parts[0]))
+
+def is_summary_chunk(metadata: dict) -> bool:
+    """요약 방식(JSON 키 스키마, 선언 목록, 구간 샘플)으로 만든 청크인지 확인합니다."""
+    return (metadata or {}).get("symbol") in SUMMARY_SYMBOLS
+
+def _count_chars(data: bytes) -> int:
+    """UTF-8 바이트열의 글자 수 (연속 바이트를 뺀 바이트 수)"""
+    return len(data) - len(data.translate(None, _NON_CONTINUATION_BYTES))
+
+
+class _PositionTracker:
+    """
+    바이트 위치를 앞에서부터 차례로 따라가며 (글자 위치, 줄 번호)로 바꿉니다.
+    메모리 매핑된 큰 파일도 1 MiB씩 나눠 세므로 파일 전체를 한 번에 복사하지 않습니다.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.byte_position = 0
+        self.char_position = 0
+        self.line_number = 1
+
+    def advance(self, byte_position: int) -> tuple[int, int]:
+        """byte_position(이전 호출보다 뒤)까지 진행하고 그 위치의 (글자 위치, 줄 번호)를 반환합니다."""
+        for position in range(self.byte_position, byte_position, 1024 * 1024):
+            block = self.data[position:min(position + 1024 * 1024, byte_position)]
+            self.char_position += _count_chars(block)
+            self.line_number += block.count(b'\n')
+        self.byte_position = max(self.byte_position, byte_position)
+        return self.char_position, self.line_number
+
+def _decode_window(data: bytes) -> str:
+    """임의 위치에서 자른 바이트 구간을 디코딩합니다. (잘린 UTF-8 문자는 버림)"""
+    start = 0
+    while start < min(len(data), 3) and data[start] & 0xC0 == 0x80:
+        start += 1
+    try:
+        return data[start:].decode('utf-8')
+    except UnicodeDecodeError:
+        return data[start:].decode('utf-8', errors='ignore')
+
+def _summary_chunk(content: str, metadata: dict, chunk_index: int, start: int, end: int,
+                   start_line: int, end_line: int, symbol: str) -> dict:
+    """요약 청크 하나를 만듭니다. start_char/end_char는 요약 대상 구간의 원본 파일 글자 위치입니다."""
+    return {
+        "content": content,
+        "metadata": {
+            **metadata,
+            "chunk_index": chunk_index,
+            "start_char": start,
+            "end_char": end,
+            "start_line": start_line,
+            "end_line": end_line,
+            "symbol": symbol,
         }
-        
-        chunks.append({
-            "content": chunk_content,
-            "metadata": metadata
-        })
+    }
 
-        # 다음 청크 시작 위치 계산 (오버랩 적용)
-        start_idx += CHUNK_SIZE - CHUNK_OVERLAP
-        chunk_num += 1
+def _json_schema_chunks(data, header: str, metadata: dict) -> list[dict]:
+    """
+    JSON 파일의 키 스키마 요약: 전체를 파싱하지 않고 바이트 정규식으로 키를 훑어 등장 횟수를 집계하고,
+    파일 앞부분 샘플과 함께 청크로 만듭니다.
+    """
+    keys = Counter()
+    for match in _JSON_KEY_PATTERN.finditer(data):
+        key = match.group(1)
+        if key in keys or len(keys) < JSON_SCHEMA_MAX_KEYS:
+            keys[key] += 1
+    head = data[:CHUNK_SIZE]
+    top_level = {b'[': "배열", b'{': "객체"}.get(head.lstrip()[:1], "알 수 없음")
+    total_chars, total_lines = _PositionTracker(data).advance(len(data))
 
+    head_text = _decode_window(head)
+    chunks = [_summary_chunk(
+        f"{header} 최상위 {top_level}, 앞부분:\n{head_text}",
+        metadata, 0, 0, len(head_text), 1, 1 + head.count(b'\n'), SUMMARY_SYMBOL_JSON_HEAD
+    )]
+    lines = [f"{decode_text(key)}: {count}" for key, count in keys.most_common()]
+    position = 0
+    while position < len(lines) and len(chunks) < SUMMARY_CHUNKS_PER_FILE:
+        piece = [f"{header} 키 스키마 (키: 등장 횟수)"]
+        size = len(piece[0])
+        while position < len(lines) and (len(piece) == 1 or size + len(lines[position]) < CHUNK_SIZE):
+            piece.append(lines[position])
+            size += len(lines[position]) + 1
+            position += 1
+        chunks.append(_summary_chunk(
+            "\n".join(piece), metadata, len(chunks), 0, total_chars, 1, total_lines, SUMMARY_SYMBOL_JSON_SCHEMA
+        ))
+    if position < len(lines):
+        chunks[-1]["content"] += f"\n... 외 키 {len(lines) - position}개"
     return chunks
 
+def _outline_chunks(data, language: str, header: str, metadata: dict) -> list[dict]:
+    """
+    코드/마크다운 파일의 선언 목록 요약: 함수/클래스 선언 줄과 마크다운 제목 줄을 줄 번호와 함께 모읍니다.
+    선언을 찾지 못하면 빈 리스트를 반환합니다.
+    """
+    pattern = _OUTLINE_PATTERNS.get(language, _BRACE_OUTLINE_PATTERN if language in BRACE_LANGUAGES else None)
+    if pattern is None:
+        return []
+    entries = []
+    tracker = _PositionTracker(data)
+    for match in pattern.finditer(data):
+        start_char, line_number = tracker.advance(match.start())
+        end_char = start_char + _count_chars(match.group(0))
+        entries.append((start_char, end_char, line_number, f"{line_number}: {decode_text(match.group(0)).strip()}"))
+
+    # 선언이 너무 많으면 파일 앞부분만 남지 않도록 일정 간격으로 골라 파일 전체를 덮음
+    capacity = SUMMARY_CHUNKS_PER_FILE * (CHUNK_SIZE - len(header) - 40)
+    total_size = sum(len(entry[3]) + 1 for entry in entries)
+    if total_size > capacity:
+        entries = entries[::-(-total_size // capacity)]
+
+    chunks = []
+    position = 0
+    while position < len(entries) and len(chunks) < SUMMARY_CHUNKS_PER_FILE:
+        piece = []
+        size = len(header)
+        while position < len(entries) and (not piece or size + len(entries[position][3]) < CHUNK_SIZE):
+            piece.append(entries[position])
+            size += len(entries[position][3]) + 1
+            position += 1
+        content = f"{header} 선언 목록 (줄 번호: 선언)\n" + "\n".join(entry[3] for entry in piece)
+        chunks.append(_summary_chunk(
+            content, metadata, len(chunks), piece[0][0], piece[-1][1], piece[0][2], piece[-1][2], SUMMARY_SYMBOL_OUTLINE
+        ))
+    if position < len(entries):
+        chunks[-1]["content"] += f"\n... 외 선언 {len(entries) - position}개"
+    return chunks
+
+def _sample_chunks(data, header: str, metadata: dict) -> list[dict]:
+    """
+    파일 전체에서 고르게 떨어진 구간 SUMMARY_CHUNKS_PER_FILE개를 골라 청크로 만듭니다. (가능하면 줄 경계에 맞춤)
+    구간 수는 서로 겹치지 않을 만큼만 둡니다.
+    """
+    size = len(data)
+    count = max(1, min(SUMMARY_CHUNKS_PER_FILE, size // CHUNK_SIZE))
+    chunks = []
+    tracker = _PositionTracker(data)
+    for i in range(count):
+        start = (size - CHUNK_SIZE) * i // (count - 1) if count > 1 else 0
+        if start > 0:
+            newline = data.find(b'\n', start, start + CHUNK_SIZE // 2)
+            start = newline + 1 if newline != -1 else start
+        end = min(start + CHUNK_SIZE, size)
+        if end < size:
+            newline = data.rfind(b'\n', start + CHUNK_SIZE // 2, end)
+            end = newline + 1 if newline != -1 else end
+        start_char, start_line = tracker.advance(start)
+        window = data[start:end]
+        content = _decode_window(window)
+        if not content.strip():
+            continue
+        end_line = start_line + window.count(b'\n')
+        chunks.append(_summary_chunk(
+            f"{header} 구간 {i + 1}/{count} (줄 {start_line}-{end_line}):\n{content}",
+            metadata, len(chunks), start_char, start_char + len(content), start_line, end_line, SUMMARY_SYMBOL_SAMPLE
+        ))
+    return chunks
+
+def summarize_file(data, file_path: Path, repo_name: str, repo_root: Path = None, reason: str = "large") -> list[dict]:
+    """
+    큰 파일이나 압축/자동 생성된 파일을 전체 청크 대신 요약 청크(최대 SUMMARY_CHUNKS_PER_FILE개)로 만듭니다.
+    data는 파일 내용 바이트 (큰 파일은 github_service.map_file로 연 메모리 매핑)이며,
+    전체를 문자열로 디코딩하지 않고 필요한 부분만 읽습니다.
+    - JSON: 키 스키마(키별 등장 횟수)와 앞부분
+    - 코드/마크다운(압축 파일 제외): 함수/클래스 선언, 제목 목록
+    - 그 외 또는 선언을 찾지 못한 경우: 파일 전체에서 고르게 뽑은 구간 샘플
+    reason("large" / "minified" / "generated")은 요약 청크 머리말에 기록됩니다.
+    """
+    language = get_file_language(file_path)
+    relative_file_path = _relative_file_path(file_path, repo_root)
+    metadata = {"file_path": relative_file_path, "repo_name": repo_name, "language": language}
+    reason_label = {"large": "큰 파일", "minified": "압축된 파일", "generated": "자동 생성된 파일"}.get(reason, reason)
+    header = f"[{relative_file_path} 요약: {reason_label}, 원본 {len(data)} 바이트]"
+
+    chunks = []
+    if language == 'json':
+        chunks = _json_schema_chunks(data, header, metadata)
+    elif reason != "minified":
+        chunks = _outline_chunks(data, language, header, metadata)
+    if not chunks:
+        chunks = _sample_chunks(data, header, metadata)
+    logger.info(f"파일 {relative_file_path}를 요약 청크 {len(chunks)}개로 인덱싱합니다 ({reason_label}, {len(data)} 바이트).")
+    return chunks
+
+def chunk_content(text: str, file_path: Path, repo_name: str, repo_root: Path = None) -> list[dict]:
+    """
+    LARGE_FILE_SIZE_BYTES 이하 파일의 청크를 만듭니다.
+    압축/자동 생성된 파일과 청크 수 제한을 넘을 만큼 큰 JSON 파일은 요약 청크로, 그 외에는 chunk_text로 나눕니다.
+    """
+    reason = detect_generated(text)
+    if reason is None and get_file_language(file_path) == 'json' and len(text) > CHUNK_SIZE * MAX_CHUNKS_PER_FILE:
+        reason = "large"
+    if reason is not None:
+        return summarize_file(text.encode('utf-8'), file_path, repo_name, repo_root, reason)
+    return chunk_text(text, file_path, repo_name, repo_root)
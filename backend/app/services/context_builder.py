@@ -0,0 +1,122 @@
+# backend/app/services/context_builder.py
+
+import os
+import re
+import logging
+from typing import List, Dict, Any
+
+from app.services.code_parser import is_summary_chunk
+from app.services.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# LLM 프롬프트에 넣을 컨텍스트의 최대 토큰 수
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# 내용의 이 비율 이상이 이미 고른 청크에 들어 있으면(단어 shingle 기준) 중복으로 보고 제외
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# 근접 중복 판단에 쓰는 shingle 크기 (연속 토큰 수)
+SHINGLE_SIZE = 5
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def _merge_adjacent_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    같은 파일에서 겹치거나 바로 이어지는 청크를 start_char/end_char 기준으로 하나로 합칩니다.
+    입력은 관련도 순이며, 합친 청크의 순위(rank)는 그중 가장 관련도가 높은 청크의 순위로 둡니다.
+    요약 청크(JSON 키 스키마, 선언 목록, 구간 샘플)는 원본 구간을 그대로 담고 있지 않으므로 합치지 않습니다.
+    """
+    by_file: Dict[tuple, List[Dict[str, Any]]] = {}
+    passthrough = []
+    for rank, chunk in enumerate(chunks):
+        metadata = chunk.get("metadata") or {}
+        if "start_char" not in metadata or "end_char" not in metadata or is_summary_chunk(metadata):
+            passthrough.append({**chunk, "rank": rank})
+            continue
+        chunk = {**chunk, "rank": rank}
+        key = (metadata.get("repo_name"), metadata.get("file_path"))
+        by_file.setdefault(key, []).append(chunk)
+
+    merged = []
+    for file_chunks in by_file.values():
+        file_chunks.sort(key=lambda chunk: chunk["metadata"]["start_char"])
+        current = None
+        for chunk in file_chunks:
+            metadata = chunk["metadata"]
+            if current is not None and metadata["start_char"] <= current["metadata"]["end_char"]:
+                # 겹치는 부분은 빼고 이어 붙임
+                overlap = current["metadata"]["end_char"] - metadata["start_char"]
+                if metadata["end_char"] > current["metadata"]["end_char"]:
+                    current["content"] += chunk["content"][overlap:]
+                    current["metadata"]["end_char"] = metadata["end_char"]
+                    current["metadata"]["end_line"] = metadata.get("end_line", current["metadata"].get("end_line"))
+                current["rank"] = min(current["rank"], chunk["rank"])
+                current["merged_ids"].append(chunk.get("id"))
+                continue
+            if current is not None:
+                merged.append(current)
+            current = {
+                **chunk,
+                "metadata": dict(metadata),
+                "merged_ids": [chunk.get("id")]
+            }
+        if current is not None:
+            merged.append(current)
+    return merged + passthrough
+
+def _shingles(text: str) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def _is_near_duplicate(shingles: set, selected_shingles: List[set]) -> bool:
+    if not shingles:
+        return False
+    for other in selected_shingles:
+        if len(shingles & other) / len(shingles) >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+def context_chunk_ids(context_chunks: List[Dict[str, Any]]) -> List[str]:
+    """병합된 청크를 포함해 컨텍스트에 들어간 모든 원본 청크 ID를 반환합니다 (답변 캐시 키용)."""
+    return [chunk_id for chunk in context_chunks for chunk_id in chunk.get("merged_ids", [chunk.get("id")])]
+
+def build_context(
+    context_chunks: List[Dict[str, Any]],
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+) -> List[Dict[str, Any]]:
+    """
+    검색된 청크를 LLM에 보낼 컨텍스트로 정리합니다.
+    1. 같은 파일의 겹치거나 인접한 청크를 합치고
+    2. 거의 같은 내용의 청크(다른 브랜치/복사된 코드 등)를 제거한 뒤
+    3. 관련도 순으로 토큰 예산 안에 들어가는 만큼만 담습니다.
+    context_chunks는 검색 결과 순서(관련도가 높은 것부터)대로 주어져야 합니다.
+    """
+    if not context_chunks:
+        return []
+
+    candidates = sorted(_merge_adjacent_chunks(context_chunks), key=lambda chunk: chunk["rank"])
+
+    packed = []
+    selected_shingles = []
+    used_tokens = 0
+    dropped_duplicates = 0
+    for chunk in candidates:
+        shingles = _shingles(chunk["content"])
+        if _is_near_duplicate(shingles, selected_shingles):
+            dropped_duplicates += 1
+            continue
+        tokens = count_tokens(chunk["content"])
+        if used_tokens + tokens > token_budget:
+            # 더 작은 청크는 남은 예산에 들어갈 수 있으므로 계속 확인
+            continue
+        packed.append(chunk)
+        selected_shingles.append(shingles)
+        used_tokens += tokens
+
+    logger.info(
+        f"컨텍스트 구성 완료: 검색 청크 {len(context_chunks)}개 -> 병합 후 {len(candidates)}개 -> "
+        f"{len(packed)}개 사용 (중복 제외 {dropped_duplicates}개, {used_tokens}/{token_budget} 토큰)."
+    )
+    return packed
@@ -0,0 +1,123 @@
+# backend/app/services/embedding_backends.py
+
+import os
+import re
+import zlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 로컬 임베딩 설정
+# 해싱 벡터 차원 (2의 거듭제곱 권장)
+HASHING_EMBEDDING_DIMENSION = int(os.getenv("HASHING_EMBEDDING_DIMENSION", "1024"))
+# sentence-transformers 백엔드에서 사용할 모델 (로컬 경로도 가능 -> 인터넷 없이 사용)
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# 로컬 모델 추론에 사용할 CPU 스레드 수
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", str(min(4, os.cpu_count() or 1))))
+# 로컬 모델에 한 번에 넣을 텍스트 수
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+
+# 단어와 식별자 분리 (snake_case -> snake, case / camelCase -> camel, case)
+_WORD_PATTERN = re.compile(r'\w+')
+_SUBWORD_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+
+
+class HashingEmbeddingBackend:
+    """
+    외부 모델 없이 단어/식별자 조각을 해시하여 고정 차원 벡터로 만드는 결정적 임베딩.
+    의미 검색 품질은 모델보다 낮지만 네트워크 없이 빠르고, 같은 입력에는 항상 같은 벡터를 반환합니다.
+    """
+
+    def __init__(self, dimension: int = HASHING_EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self.model = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> list[int]:
+        features = []
+        for word in _WORD_PATTERN.findall(text):
+            features.append(zlib.crc32(word.lower().encode("utf-8")))
+            parts = _SUBWORD_PATTERN.findall(word)
+            if len(parts) > 1:
+                features.extend(zlib.crc32(part.lower().encode("utf-8")) for part in parts)
+        return features
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            hashes.extend(features)
+
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        # 해시 하위 비트로 차원, 최상위 비트로 부호를 정해 충돌의 영향을 상쇄
+        columns = (hashes % self.dimension).astype(np.int64)
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), columns), signs)
+
+        # 자주 나오는 단어의 영향을 줄이고 (sublinear tf) 코사인 비교가 가능하도록 정규화
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return matrix.tolist()
+
+
+class SentenceTransformerBackend:
+    """
+    sentence-transformers 호환 로컬 모델로 CPU에서 배치 추론하는 임베딩.
+    sentence-transformers 패키지가 설치되어 있어야 합니다 (선택 의존성).
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, threads: int = EMBEDDING_THREADS):
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "sentence-transformers 임베딩 백엔드를 사용하려면 'pip install sentence-transformers'가 필요합니다."
+            ) from e
+        torch.set_num_threads(threads)
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dimension = self._model.get_sentence_embedding_dimension()
+        self.model = f"sentence-transformers/{model_name.rsplit('/', 1)[-1]}"
+        logger.info(f"로컬 임베딩 모델 {model_name} 로드 완료 (차원 {self.dimension}, 스레드 {threads}개).")
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        embeddings = self._model.encode(
+            texts,
+            batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return embeddings.astype(np.float32).tolist()
+
+
+LOCAL_BACKENDS = {
+    "hashing": HashingEmbeddingBackend,
+    "sentence-transformers": SentenceTransformerBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def local_model_name(backend_name: str) -> str:
+    """로컬 백엔드가 만드는 임베딩의 모델 이름 (캐시 키/컬렉션 메타데이터용). 모델을 로드하지 않습니다."""
+    if backend_name == "hashing":
+        return f"hashing-{HASHING_EMBEDDING_DIMENSION}"
+    if backend_name == "sentence-transformers":
+        return f"sentence-transformers/{LOCAL_EMBEDDING_MODEL.rsplit('/', 1)[-1]}"
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend_name} (가능한 값: openai, {', '.join(LOCAL_BACKENDS)})")
+
+def get_local_backend(backend_name: str):
+    """로컬 임베딩 백엔드를 처음 사용할 때 생성합니다 (모델 로드는 한 번만)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if backend_name not in LOCAL_BACKENDS:
+                raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend_name}")
+            _backend = LOCAL_BACKENDS[backend_name]()
+    return _backend
@@ -0,0 +1,130 @@
+# backend/app/services/embedding_cache.py
+
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 임베딩 캐시 SQLite 파일 경로 (레포/브랜치/실행에 관계없이 공유)
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite3"))
+# 캐시에 보관할 벡터 데이터의 최대 크기 (바이트). 넘으면 가장 오래 사용하지 않은 항목부터 제거
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# SQLite 변수 개수 제한을 넘지 않도록 한 번에 조회할 키 수
+_LOOKUP_BATCH_SIZE = 500
+
+_connection = None
+_total_bytes = 0
+_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """캐시 DB 연결을 처음 사용할 때 열고 테이블을 준비합니다."""
+    global _connection, _total_bytes
+    if _connection is None:
+        EMBEDDING_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(EMBEDDING_CACHE_PATH, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        _total_bytes = connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        _connection = connection
+        logger.info(f"임베딩 캐시 {EMBEDDING_CACHE_PATH} 열기 완료 (현재 {_total_bytes} 바이트).")
+    return _connection
+
+def make_cache_key(model: str, text: str) -> str:
+    """(모델, 청크 텍스트)를 기반으로 한 콘텐츠 주소 키를 생성합니다."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+def lookup_embeddings(model: str, texts: list[str]) -> list[list[float] | None]:
+    """
+    캐시에서 텍스트별 임베딩을 조회합니다.
+    입력 순서대로 결과를 반환하며, 캐시에 없는 항목은 None입니다.
+    """
+    keys = [make_cache_key(model, text) for text in texts]
+    found = {}
+    with _lock:
+        connection = _get_connection()
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), _LOOKUP_BATCH_SIZE):
+            batch = unique_keys[i:i + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        if found:
+            # LRU 순서를 위해 조회된 항목의 마지막 사용 시각 갱신
+            now = time.time()
+            connection.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            connection.commit()
+    return [found.get(key) for key in keys]
+
+def store_embeddings(model: str, texts: list[str], embeddings: list[list[float]]):
+    """
+    새로 생성한 임베딩을 float32로 캐시에 저장하고, 크기 제한을 넘으면 오래된 항목을 제거합니다.
+    """
+    global _total_bytes
+    if not texts:
+        return
+    now = time.time()
+    rows = {}
+    for text, embedding in zip(texts, embeddings):
+        rows[make_cache_key(model, text)] = array("f", embedding).tobytes()
+
+    with _lock:
+        connection = _get_connection()
+        # 이미 있던 키를 덮어쓰는 경우 크기가 중복 집계되지 않도록 기존 크기를 뺌
+        existing = 0
+        keys = list(rows)
+        for i in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+            batch = keys[i:i + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            existing += connection.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchone()[0]
+        connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+            [(key, blob, now) for key, blob in rows.items()]
+        )
+        _total_bytes += sum(len(blob) for blob in rows.values()) - existing
+        if _total_bytes > EMBEDDING_CACHE_MAX_BYTES:
+            _evict(connection)
+        connection.commit()
+
+def _evict(connection: sqlite3.Connection):
+    """최대 크기의 90% 아래로 내려갈 때까지 가장 오래 사용하지 않은 항목을 제거합니다."""
+    global _total_bytes
+    target_bytes = int(EMBEDDING_CACHE_MAX_BYTES * 0.9)
+    evicted = 0
+    while _total_bytes > target_bytes:
+        rows = connection.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT ?", (_LOOKUP_BATCH_SIZE,)
+        ).fetchall()
+        if not rows:
+            _total_bytes = 0
+            break
+        for key, size in rows:
+            if _total_bytes <= target_bytes:
+                break
+            connection.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+            _total_bytes -= size
+            evicted += 1
+    logger.info(f"임베딩 캐시 크기 제한 초과로 {evicted}개 항목 제거 (현재 {_total_bytes} 바이트).")
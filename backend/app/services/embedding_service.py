@@ -1,36 +1,213 @@
 # backend/app/services/embedding_service.py
 
 import os
+import asyncio
+import random
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+from app.services.embedding_backends import LOCAL_EMBEDDING_BATCH_SIZE, get_local_backend, local_model_name
+from app.services.embedding_cache import lookup_embeddings, store_embeddings
+from app.services.service_container import get_openai_client
+from app.services.metrics import EMBEDDING_CACHE_LOOKUPS, OPENAI_REQUESTS, record_openai_usage, track_stage
+from app.services.token_counter import count_tokens, truncate_to_tokens
 
 logger = logging.getLogger(__name__)
 
-# OpenAI 클라이언트 초기화
-# 환경 변수 OPENAI_API_KEY가 설정되어 있어야 합니다.
-client = OpenAI()
+# 임베딩 백엔드: "openai" (기본), "hashing" (외부 의존성 없는 로컬 해싱 벡터),
+# "sentence-transformers" (로컬 CPU 모델). 로컬 백엔드는 네트워크/API 키 없이 동작합니다.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
 
-# 사용할 임베딩 모델 이름 (OpenAI 기준)
-EMBEDDING_MODEL = "text-embedding-3-small" # 또는 "text-embedding-3-large" (더 정확하지만 비용 높음)
+# OpenAI 임베딩 모델 이름
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small" # 또는 "text-embedding-3-large" (더 정확하지만 비용 높음)
+# 현재 백엔드가 만드는 임베딩의 모델 이름. 캐시 키와 컬렉션 메타데이터에 사용되어 서로 다른 임베딩이 섞이지 않도록 함
+EMBEDDING_MODEL = OPENAI_EMBEDDING_MODEL if EMBEDDING_BACKEND == "openai" else local_model_name(EMBEDDING_BACKEND)
 
-async def get_embeddings(texts: list[str]) -> list[list[float]]:
+# 한 번의 API 요청에 담을 최대 토큰 수 / 입력 수 (OpenAI 한도: 요청당 300,000 토큰, 2048개 입력)
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "1024"))
+# 입력 하나당 최대 토큰 수 (모델 컨텍스트 한도). 넘는 텍스트는 잘라서 보냄
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+# 동시에 실행할 임베딩 API 요청 수 (서버 전체 공유)
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+# 429/일시적 오류 재시도 설정
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+EMBEDDING_RETRY_BASE_DELAY = 1.0
+EMBEDDING_RETRY_MAX_DELAY = 60.0
+
+_semaphore = None
+_local_lock = None
+
+
+def _get_client() -> AsyncOpenAI:
+    """
+    공유 OpenAI 클라이언트 (처음 사용할 때 생성, 로컬 백엔드만 쓰면 API 키가 없어도 됨).
+    재시도는 아래 _embed_batch에서 직접 처리하므로 SDK 자체 재시도는 끔
+    """
+    return get_openai_client().with_options(max_retries=0)
+
+def collection_embedding_model(collection_metadata: dict) -> str:
+    """컬렉션에 저장된 임베딩의 모델 이름. 메타데이터가 없는 이전 컬렉션은 OpenAI 모델로 만든 것으로 봅니다."""
+    return (collection_metadata or {}).get("embedding_model", OPENAI_EMBEDDING_MODEL)
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """동시 요청 수를 제한하는 세마포어를 처음 사용할 때 생성합니다."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+    return _semaphore
+
+def _make_batches(texts: list[str]) -> list[list[int]]:
+    """
+    토큰 예산과 입력 수 제한을 지키도록 텍스트 인덱스를 배치로 나눕니다.
+    로컬 백엔드는 토큰 예산 없이 LOCAL_EMBEDDING_BATCH_SIZE개씩 나눕니다.
+    """
+    if EMBEDDING_BACKEND != "openai":
+        return [list(range(i, min(i + LOCAL_EMBEDDING_BATCH_SIZE, len(texts)))) for i in range(0, len(texts), LOCAL_EMBEDDING_BATCH_SIZE)]
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS or len(current) >= EMBEDDING_BATCH_MAX_INPUTS):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Retry-After 헤더가 있으면 따르고, 없으면 지수 백오프 + 지터로 대기 시간을 정합니다."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), EMBEDDING_RETRY_MAX_DELAY) + random.uniform(0, 0.5)
+            except ValueError:
+                pass
+    delay = min(EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt), EMBEDDING_RETRY_MAX_DELAY)
+    return random.uniform(delay / 2, delay) # full jitter로 재시도가 한꺼번에 몰리지 않도록 함
+
+async def _embed_local_batch(batch_texts: list[str]) -> list[list[float]]:
+    """
+    로컬 백엔드로 배치를 임베딩합니다. 추론은 스레드에서 실행하며,
+    모델이 EMBEDDING_THREADS만큼 CPU를 쓰므로 배치는 한 번에 하나씩 처리합니다.
+    """
+    global _local_lock
+    if _local_lock is None:
+        _local_lock = asyncio.Lock()
+    async with _local_lock:
+        backend = await asyncio.to_thread(get_local_backend, EMBEDDING_BACKEND)
+        return await asyncio.to_thread(backend.embed, batch_texts)
+
+async def _embed_batch(batch_texts: list[str]) -> list[list[float]]:
+    """
+    하나의 배치를 임베딩합니다. 429 및 일시적 오류는 백오프 후 재시도합니다.
+    """
+    if EMBEDDING_BACKEND != "openai":
+        return await _embed_local_batch(batch_texts)
+
+    semaphore = _get_semaphore()
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                response = await _get_client().embeddings.create(
+                    input=batch_texts,
+                    model=OPENAI_EMBEDDING_MODEL
+                )
+            record_openai_usage("embeddings", OPENAI_EMBEDDING_MODEL, response.usage)
+            # 응답 순서가 입력 순서와 같다는 보장이 없으므로 index 기준으로 정렬
+            return [data.embedding for data in sorted(response.data, key=lambda data: data.index)]
+        except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+            if attempt >= EMBEDDING_MAX_RETRIES:
+                OPENAI_REQUESTS.labels("embeddings", OPENAI_EMBEDDING_MODEL, "error").inc()
+                raise
+            OPENAI_REQUESTS.labels("embeddings", OPENAI_EMBEDDING_MODEL, "retry").inc()
+            delay = _retry_delay(attempt, e)
+            logger.warning(f"임베딩 API 일시적 오류 ({type(e).__name__}), {delay:.1f}초 후 재시도 ({attempt + 1}/{EMBEDDING_MAX_RETRIES}).")
+            await asyncio.sleep(delay)
+
+async def _embed_and_cache_batch(batch_texts: list[str], request_texts: list[str]) -> list[list[float]]:
+    """
+    배치를 임베딩하고 바로 캐시에 저장하여, 이후 배치가 실패해도 완료된 결과는 재사용되도록 합니다.
+    request_texts는 API로 보낼 (토큰 한도에 맞게 잘린) 텍스트, 캐시 키는 원본 batch_texts 기준입니다.
+    """
+    embeddings = await _embed_batch(request_texts)
+    try:
+        await asyncio.to_thread(store_embeddings, EMBEDDING_MODEL, batch_texts, embeddings)
+    except Exception as e:
+        # 캐시 저장 실패는 인덱싱을 막지 않음
+        logger.warning(f"임베딩 캐시 저장 중 오류 발생: {e}")
+    return embeddings
+
+async def _embed_texts(texts: list[str]) -> list[list[float]]:
+    """
+    텍스트를 토큰 예산에 맞는 배치로 나누어 제한된 동시성으로 임베딩하고, 입력 순서대로 반환합니다.
+    """
+    request_texts = [truncate_to_tokens(text, EMBEDDING_MAX_INPUT_TOKENS) for text in texts]
+    batches = _make_batches(request_texts)
+    tasks = [
+        asyncio.create_task(_embed_and_cache_batch([texts[i] for i in batch], [request_texts[i] for i in batch]))
+        for batch in batches
+    ]
+    try:
+        batch_results = await asyncio.gather(*tasks)
+    except BaseException:
+        # 한 배치가 실패하면 나머지 요청도 취소
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    embeddings = [None] * len(texts)
+    for batch, batch_embeddings in zip(batches, batch_results):
+        for i, embedding in zip(batch, batch_embeddings):
+            embeddings[i] = embedding
+    logger.info(f"{len(batches)}개 배치로 {len(texts)}개 텍스트 임베딩 완료.")
+    return embeddings
+
+async def get_embeddings(texts: list[str], stats: dict = None) -> list[list[float]]:
     """
     주어진 텍스트 리스트에 대한 임베딩 벡터를 생성합니다.
+    먼저 임베딩 캐시를 조회하고, 캐시에 없는 텍스트만 API로 보냅니다.
+    stats가 주어지면 "cache_hits", "cache_misses" 값을 누적합니다. (둘 다 입력 텍스트 개수 기준이며, 같은 텍스트가 여러 번 나오면 각각 셈)
     """
     if not texts:
         return []
 
     try:
-        # OpenAI 임베딩 API 호출
-        response = client.embeddings.create(
-            input=texts,
-            model=EMBEDDING_MODEL
-        )
-        # 응답에서 임베딩 벡터만 추출하여 반환
-        embeddings = [data.embedding for data in response.data]
-        logger.info(f"성공적으로 {len(texts)}개 텍스트에 대한 임베딩 생성 완료.")
+        embeddings = await asyncio.to_thread(lookup_embeddings, EMBEDDING_MODEL, texts)
+    except Exception as e:
+        logger.warning(f"임베딩 캐시 조회 중 오류 발생, 캐시 없이 진행합니다: {e}")
+        embeddings = [None] * len(texts)
+
+    # 캐시에 없는 텍스트 (같은 텍스트가 여러 번 나오면 한 번만 요청)
+    miss_texts = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+    misses = sum(1 for embedding in embeddings if embedding is None)
+    hits = len(texts) - misses
+    EMBEDDING_CACHE_LOOKUPS.labels("hit").inc(hits)
+    EMBEDDING_CACHE_LOOKUPS.labels("miss").inc(misses)
+    if stats is not None:
+        stats["cache_hits"] = stats.get("cache_hits", 0) + hits
+        stats["cache_misses"] = stats.get("cache_misses", 0) + misses
+
+    if not miss_texts:
+        logger.info(f"{len(texts)}개 텍스트 임베딩을 모두 캐시에서 가져왔습니다.")
         return embeddings
 
+    try:
+        # 임베딩 백엔드 호출 (배치/동시성/재시도 처리, 완료된 배치는 바로 캐시에 저장)
+        with track_stage("embed"):
+            new_embeddings = await _embed_texts(miss_texts)
+        logger.info(f"성공적으로 {len(miss_texts)}개 텍스트에 대한 임베딩 생성 완료. (캐시 적중 {hits}개)")
+
     except Exception as e:
         logger.error(f"임베딩 생성 중 오류 발생: {e}")
-        raise # 오류를 다시 발생시켜 상위 호출자에게 알립니다.
\ No newline at end of file
+        raise # 오류를 다시 발생시켜 상위 호출자에게 알립니다.
+
+    new_by_text = dict(zip(miss_texts, new_embeddings))
+    return [embedding if embedding is not None else new_by_text[text] for text, embedding in zip(texts, embeddings)]
@@ -0,0 +1,51 @@
+# backend/app/services/index_state_service.py
+
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 레포지토리별 마지막 인덱싱 상태(커밋 SHA 등)를 저장하는 경로
+INDEX_STATE_DIR = Path("./data/index_state")
+
+
+def _state_path(repo_name: str) -> Path:
+    """레포지토리 이름에 해당하는 상태 파일 경로를 반환합니다."""
+    safe_name = repo_name.replace("/", "__")
+    return INDEX_STATE_DIR / f"{safe_name}.json"
+
+def load_index_state(repo_name: str) -> dict | None:
+    """
+    레포지토리의 마지막 인덱싱 상태를 불러옵니다.
+    상태 파일이 없거나 읽을 수 없으면 None을 반환합니다.
+    """
+    state_path = _state_path(repo_name)
+    if not state_path.exists():
+        return None
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"인덱싱 상태 파일 {state_path} 읽기 실패: {e}")
+        return None
+
+def save_index_state(repo_name: str, state: dict):
+    """
+    레포지토리의 인덱싱 상태를 저장합니다.
+    임시 파일에 쓴 뒤 교체하여 중간에 실패해도 기존 상태가 깨지지 않도록 합니다.
+    """
+    INDEX_STATE_DIR.mkdir(parents=True, exist_ok=True)
+    state_path = _state_path(repo_name)
+    tmp_path = state_path.with_suffix(".json.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(state_path)
+    logger.info(f"레포지토리 {repo_name} 인덱싱 상태 저장 완료: {state.get('last_commit')}")
+
+def delete_index_state(repo_name: str):
+    """레포지토리의 인덱싱 상태를 삭제합니다."""
+    state_path = _state_path(repo_name)
+    if state_path.exists():
+        state_path.unlink()
+        logger.info(f"레포지토리 {repo_name} 인덱싱 상태 삭제 완료.")
@@ -0,0 +1,447 @@
+# backend/app/services/indexing_service.py
+
+import os
+import asyncio
+import logging
+from contextlib import aclosing
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.services.clone_manager import clone_repository
+from app.services.github_service import get_changed_files, get_repo_files
+from app.services.ingest_pool import iter_file_chunks
+from app.services.embedding_service import EMBEDDING_BACKEND, EMBEDDING_MODEL, collection_embedding_model, get_embeddings
+from app.services.vector_db_service import (
+    add_documents_to_collection,
+    delete_documents_from_collection,
+    drop_collection,
+    get_collection_metadata,
+    get_document_ids,
+    get_repo_collection_name,
+    has_documents,
+)
+from app.services import chunk_registry, lexical_index, snapshot_service
+from app.services.chunk_registry import make_chunk_id
+from app.services.metrics import PIPELINE_QUEUE_DEPTH, track_stage
+from app.services.index_state_service import delete_index_state, load_index_state, save_index_state
+from app.services.query_cache import invalidate_repo
+
+logger = logging.getLogger(__name__)
+
+REPOS_DIR = Path("./data/repos")
+
+# 이전 버전에서 모든 레포지토리가 함께 쓰던 컬렉션 이름.
+# 이제는 레포지토리별 컬렉션을 쓰며, 전체 인덱싱/삭제 시 이 컬렉션에 남은 해당 레포 청크를 정리합니다.
+LEGACY_COLLECTION_NAME = "repo_code_chunks"
+# 증분 인덱싱 시 한 번의 delete 호출에 포함할 최대 파일 경로 수
+DELETE_BATCH_SIZE = 500
+
+# 스트리밍 파이프라인 설정
+# 임베딩/저장 단위가 되는 청크 배치 크기
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "256"))
+# 단계 사이 큐에 쌓아둘 수 있는 최대 배치 수 (넘으면 앞 단계가 대기 -> 메모리 사용량 일정)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+# 동시에 임베딩을 요청하는 파이프라인 워커 수
+PIPELINE_EMBED_WORKERS = int(os.getenv("PIPELINE_EMBED_WORKERS", "2"))
+# 한 번의 인덱싱 실행에서 만들 최대 청크 수 (0이면 제한 없음). 넘으면 나머지 파일은 인덱싱하지 않음
+MAX_CHUNKS_PER_REPO = int(os.getenv("MAX_CHUNKS_PER_REPO", "200000"))
+
+
+# 같은 레포지토리 디렉토리를 동시에 클론/인덱싱하지 않도록 레포별 락 관리
+_repo_locks: dict[str, asyncio.Lock] = {}
+
+
+class IndexingError(Exception):
+    """레포지토리 인덱싱 중 발생한 오류 (HTTP 응답으로 변환할 메시지를 담음)"""
+
+
+def _get_repo_lock(repo_name: str) -> asyncio.Lock:
+    """레포지토리 이름에 해당하는 락을 반환합니다."""
+    if repo_name not in _repo_locks:
+        _repo_locks[repo_name] = asyncio.Lock()
+    return _repo_locks[repo_name]
+
+
+async def _produce_chunks(
+    file_paths: list[Path],
+    repo_name: str,
+    repo_root: Path,
+    chunk_queue: asyncio.Queue,
+    stats: dict,
+    skipped_paths: set[str]
+):
+    """
+    [읽기 -> 청크] 단계: 파일 읽기/청크 분할을 프로세스 풀에서 병렬로 실행하고, 청크를 파일 순서대로 배치에 모아 큐에 넣습니다.
+    큐가 가득 차면 임베딩 단계가 따라올 때까지 기다립니다 (backpressure).
+    청크 수가 MAX_CHUNKS_PER_REPO를 넘게 되는 파일부터는 건너뛰고, 건너뛴 파일의 상대 경로를 skipped_paths에 기록합니다.
+    """
+    batch = []
+    # 중간에 취소되면 바로 닫아서 아직 시작하지 않은 프로세스 작업도 취소되도록 함
+    async with aclosing(iter_file_chunks(file_paths, repo_name, repo_root)) as file_chunks:
+        async for path, chunks in file_chunks:
+            stats["files_scanned"] += 1
+            if not chunks: # 내용이 비어있지 않은 파일만 처리
+                logger.warning(f"파일 내용이 비어있거나 읽기 실패: {path}")
+                continue
+            if MAX_CHUNKS_PER_REPO and stats["chunks_created"] + len(chunks) > MAX_CHUNKS_PER_REPO:
+                if not stats["files_over_budget"]:
+                    logger.warning(f"레포지토리 {repo_name}의 청크 수 제한({MAX_CHUNKS_PER_REPO}개)에 도달하여 이후 파일을 건너뜁니다.")
+                stats["files_over_budget"] += 1
+                skipped_paths.add(path.relative_to(repo_root).as_posix())
+                continue
+
+            for chunk in chunks:
+                batch.append(chunk)
+                stats["chunks_created"] += 1
+                if len(batch) >= PIPELINE_BATCH_SIZE:
+                    await chunk_queue.put(batch)
+                    PIPELINE_QUEUE_DEPTH.labels("chunk").set(chunk_queue.qsize())
+                    batch = []
+    if batch:
+        await chunk_queue.put(batch)
+
+async def _embed_chunks(chunk_queue: asyncio.Queue, write_queue: asyncio.Queue, stats: dict):
+    """[임베딩] 단계: 청크 배치를 임베딩하여 저장 큐로 넘깁니다. None을 받으면 종료합니다."""
+    while True:
+        batch = await chunk_queue.get()
+        PIPELINE_QUEUE_DEPTH.labels("chunk").set(chunk_queue.qsize())
+        if batch is None:
+            return
+        contents = [chunk["content"] for chunk in batch]
+        embeddings = await get_embeddings(contents, stats=stats["embedding_cache"])
+        stats["chunks_embedded"] += len(batch)
+        await write_queue.put((batch, embeddings))
+        PIPELINE_QUEUE_DEPTH.labels("write").set(write_queue.qsize())
+
+async def _write_chunks(collection_name: str, repo_name: str, run_id: int, write_queue: asyncio.Queue, stats: dict):
+    """
+    [저장] 단계: 임베딩된 배치의 메타데이터를 청크 메타데이터 저장소에, 임베딩을 벡터 DB에 저장하고,
+    같은 ID로 키워드 검색 인덱스에도 추가합니다. None을 받으면 종료합니다.
+    청크 ID는 (레포, 파일 경로, 청크 순번, 내용 해시)로 정해지므로 바뀌지 않은 청크는 같은 ID로 덮어씁니다.
+    """
+    while True:
+        item = await write_queue.get()
+        PIPELINE_QUEUE_DEPTH.labels("write").set(write_queue.qsize())
+        if item is None:
+            return
+        batch, embeddings = item
+        documents = [chunk["content"] for chunk in batch]
+        metadatas = [chunk["metadata"] for chunk in batch]
+        ids = [
+            make_chunk_id(repo_name, metadata["file_path"], metadata["chunk_index"], metadata["content_hash"])
+            for metadata in metadatas
+        ]
+        # 검색 결과의 메타데이터를 바로 채울 수 있도록 저장소에 먼저 기록
+        await asyncio.to_thread(chunk_registry.upsert_chunks, repo_name, ids, metadatas, run_id)
+        await add_documents_to_collection(
+            collection_name,
+            documents,
+            None, # 메타데이터는 청크 메타데이터 저장소에만 저장
+            embeddings,
+            ids,
+            # 어떤 임베딩으로 만든 컬렉션인지 기록하여 다른 백엔드의 벡터가 섞이지 않도록 함
+            collection_metadata={
+                "repo_name": repo_name,
+                "embedding_backend": EMBEDDING_BACKEND,
+                "embedding_model": EMBEDDING_MODEL,
+                "embedding_dimension": len(embeddings[0])
+            }
+        )
+        await asyncio.to_thread(lexical_index.add_documents, repo_name, ids, documents)
+        stats["vectors_written"] += len(batch)
+
+async def run_ingestion_pipeline(
+    file_paths: list[Path],
+    repo_name: str,
+    repo_root: Path,
+    run_id: int,
+    collection_name: str,
+    stats: dict = None,
+    skipped_paths: set[str] = None
+) -> dict:
+    """
+    읽기 -> 청크 -> 임베딩 -> 저장 단계를 크기가 제한된 큐로 연결한 스트리밍 파이프라인을 실행합니다.
+    각 단계가 동시에 진행되므로 전체 시간은 단계별 시간의 합이 아니라 가장 느린 단계에 가깝고,
+    한 번에 메모리에 올라가는 청크는 (큐 크기 x 배치 크기) 정도로 제한됩니다.
+    stats가 주어지면 진행 상황(파일/청크/벡터 수)을 그 dict에 실시간으로 기록합니다.
+    skipped_paths가 주어지면 청크 수 제한으로 건너뛴 파일의 상대 경로를 그 set에 기록합니다.
+    """
+    if stats is None:
+        stats = {}
+    if skipped_paths is None:
+        skipped_paths = set()
+    stats.update({
+        "files_scanned": 0,
+        "chunks_created": 0,
+        "files_over_budget": 0,
+        "chunks_embedded": 0,
+        "vectors_written": 0,
+        "embedding_cache": {"cache_hits": 0, "cache_misses": 0}
+    })
+    chunk_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    write_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    async def produce():
+        await _produce_chunks(file_paths, repo_name, repo_root, chunk_queue, stats, skipped_paths)
+        for _ in range(PIPELINE_EMBED_WORKERS):
+            await chunk_queue.put(None)
+
+    async def embed():
+        await asyncio.gather(*(_embed_chunks(chunk_queue, write_queue, stats) for _ in range(PIPELINE_EMBED_WORKERS)))
+        await write_queue.put(None)
+
+    tasks = [
+        asyncio.create_task(produce()),
+        asyncio.create_task(embed()),
+        asyncio.create_task(_write_chunks(collection_name, repo_name, run_id, write_queue, stats))
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # 한 단계가 실패하면 나머지 단계도 중단 (큐에서 영원히 기다리지 않도록)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return stats
+
+async def _delete_stale_chunks(
+    collection_name: str,
+    repo_name: str,
+    run_id: int,
+    stale_paths: set[str] = None
+):
+    """
+    이번 인덱싱 실행(run_id)에서 쓰지 않은 청크를 벡터 DB, 키워드 검색 인덱스, 청크 메타데이터 저장소에서 삭제합니다.
+    stale_paths가 None이면 레포 전체, 아니면 해당 파일들의 이전 청크만 삭제합니다.
+    """
+    stale_ids = await asyncio.to_thread(chunk_registry.stale_chunk_ids, repo_name, run_id, stale_paths)
+    if stale_paths is None:
+        # 전체 인덱싱: 저장소에 없는 청크(이전 방식의 임의 ID 청크 등)도 벡터 DB에서 정리
+        live_ids = await asyncio.to_thread(chunk_registry.run_chunk_ids, repo_name, run_id)
+        stale_vector_ids = [chunk_id for chunk_id in await get_document_ids(collection_name) if chunk_id not in live_ids]
+    else:
+        stale_vector_ids = stale_ids
+    await _delete_chunk_ids(collection_name, stale_vector_ids)
+    await asyncio.to_thread(lexical_index.delete_documents, stale_ids)
+    await asyncio.to_thread(chunk_registry.delete_chunks, stale_ids)
+
+async def _delete_chunk_ids(collection_name: str, ids: list[str]):
+    """벡터 DB에서 청크를 ID로 나누어 삭제합니다."""
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        await delete_documents_from_collection(collection_name, ids=ids[i:i + DELETE_BATCH_SIZE])
+
+async def index_repository(
+    repo_url: str,
+    repo_name: str,
+    branch: str = "main",
+    github_pat: str = None,
+    incremental: bool = True,
+    progress: dict = None
+) -> dict:
+    """
+    지정된 GitHub 레포지토리를 클론하고, 파일을 읽어 청크로 분할하고,
+    임베딩을 생성하여 벡터 DB에 저장합니다.
+    incremental=True이면 마지막으로 인덱싱한 커밋과의 git diff를 기준으로
+    추가/수정된 파일만 다시 임베딩하고, 삭제/수정된 파일의 기존 청크는 제거합니다.
+    progress가 주어지면 현재 단계("stage")와 단계별 진행 수치를 그 dict에 기록합니다.
+    같은 레포지토리에 대한 인덱싱은 한 번에 하나씩만 실행됩니다.
+    """
+    if progress is None:
+        progress = {}
+    lock = _get_repo_lock(repo_name)
+    if lock.locked():
+        progress["stage"] = "waiting"
+        logger.info(f"레포지토리 {repo_name}의 다른 인덱싱 작업이 끝나기를 기다립니다.")
+    async with lock:
+        try:
+            result = await _index_repository(repo_url, repo_name, branch, github_pat, incremental, progress)
+            # 다시 인덱싱한 레포는 불러온 스냅샷(이전 시점의 인덱스) 대신 벡터 DB에서 검색하도록 스냅샷 검색 중단
+            await asyncio.to_thread(snapshot_service.unload_snapshot, repo_name)
+            return result
+        finally:
+            # 인덱스 내용이 바뀌었을 수 있으므로 해당 레포의 쿼리 캐시 무효화
+            invalidate_repo(repo_name)
+
+async def _index_repository(
+    repo_url: str,
+    repo_name: str,
+    branch: str,
+    github_pat: str,
+    incremental: bool,
+    progress: dict
+) -> dict:
+    """index_repository의 실제 구현 (레포별 락을 잡은 상태에서 호출)"""
+    local_repo_path = REPOS_DIR / repo_name
+    collection_name = get_repo_collection_name(repo_name)
+
+    REPOS_DIR.mkdir(parents=True, exist_ok=True)
+
+    # 기존 컬렉션이 다른 임베딩 모델로 만들어졌으면 벡터가 섞이지 않도록 중단
+    try:
+        collection_metadata = await get_collection_metadata(collection_name)
+    except Exception as e:
+        raise IndexingError(f"벡터 DB 조회 중 오류 발생: {e}")
+    if collection_metadata is not None and collection_embedding_model(collection_metadata) != EMBEDDING_MODEL:
+        raise IndexingError(
+            f"레포지토리 {repo_name}의 인덱스는 '{collection_embedding_model(collection_metadata)}' 임베딩으로 만들어졌습니다. "
+            f"현재 임베딩('{EMBEDDING_MODEL}')으로 인덱싱하려면 먼저 DELETE /repo/index로 인덱스를 삭제하세요."
+        )
+
+    # 얕은 클론에서도 증분 인덱싱 diff가 가능하도록 마지막 인덱싱 커밋을 함께 받아옴
+    state = load_index_state(repo_name) if incremental else None
+    keep_commits = [state["last_commit"]] if state and state.get("branch") == branch and state.get("last_commit") else None
+
+    progress["stage"] = "cloning"
+    logger.info(f"레포지토리 {repo_url} 클론 또는 업데이트 시작.")
+    with track_stage("clone"):
+        repo = await clone_repository(repo_url, local_repo_path, branch, github_pat, keep_commits)
+
+    if repo is None:
+        raise IndexingError(f"레포지토리 클론 또는 업데이트 실패: {repo_url}")
+
+    head_commit = repo.head.commit.hexsha
+
+    # 마지막 인덱싱 커밋과 비교하여 증분 인덱싱 가능 여부 판단
+    changes = None
+    if state and state.get("branch") == branch and state.get("last_commit"):
+        try:
+            indexed = await has_documents(collection_name)
+            lexically_indexed = await asyncio.to_thread(lexical_index.has_repo_documents, repo_name)
+            registered = await asyncio.to_thread(chunk_registry.has_repo_chunks, repo_name)
+        except Exception as e:
+            raise IndexingError(f"벡터 DB 조회 중 오류 발생: {e}")
+        if not indexed:
+            logger.warning(f"레포지토리 {repo_name}의 인덱싱 상태는 있지만 벡터 DB에 청크가 없습니다. 전체 인덱싱으로 전환합니다.")
+        elif not lexically_indexed:
+            # 키워드 검색 인덱스가 생기기 전에 인덱싱된 레포 (임베딩은 캐시에서 재사용됨)
+            logger.warning(f"레포지토리 {repo_name}의 키워드 검색 인덱스가 없습니다. 전체 인덱싱으로 전환합니다.")
+        elif not registered:
+            # 청크 메타데이터를 벡터 DB에 함께 저장하던 이전 방식으로 인덱싱된 레포
+            logger.warning(f"레포지토리 {repo_name}의 청크 메타데이터 저장소가 비어 있습니다. 전체 인덱싱으로 전환합니다.")
+        elif state["last_commit"] == head_commit and not state.get("skipped_paths"):
+            logger.info(f"레포지토리 {repo_name}는 이미 커밋 {head_commit}까지 인덱싱되어 있습니다.")
+            return {
+                "message": f"레포지토리 {repo_name}는 이미 최신 상태입니다.",
+                "repo_path": str(local_repo_path),
+                "mode": "incremental",
+                "commit": head_commit,
+                "total_files": 0,
+                "total_chunks_processed": 0,
+                "deleted_files": 0
+            }
+        else:
+            changes = await asyncio.to_thread(get_changed_files, repo, state["last_commit"], head_commit)
+
+    progress["stage"] = "scanning"
+    logger.info(f"레포지토리 {repo_name} 파일 스캔 및 청크 생성 시작.")
+    with track_stage("scan"):
+        if changes is None:
+            mode = "full"
+            removed_paths = set()
+            retry_paths = set()
+            file_paths = await asyncio.to_thread(get_repo_files, local_repo_path)
+        else:
+            mode = "incremental"
+            changed_paths, removed_paths = changes
+            # 이전 실행에서 청크 수 제한으로 건너뛴 파일은 바뀌지 않았어도 다시 시도 (남아 있던 이전 청크는 교체)
+            retry_paths = set(state.get("skipped_paths", []))
+            file_paths = await asyncio.to_thread(get_repo_files, local_repo_path, None, changed_paths | retry_paths)
+            logger.info(f"증분 인덱싱: {state['last_commit']} -> {head_commit}, 다시 인덱싱할 파일 {len(file_paths)}개, 제거할 파일 {len(removed_paths)}개.")
+
+    # 이번 실행에서 저장하는 청크를 구분하기 위한 ID.
+    # 새 청크를 먼저 저장한 뒤 이전 실행의 청크를 지우므로 재인덱싱 중에도 검색 결과가 비지 않음
+    run_id = await asyncio.to_thread(chunk_registry.start_run, repo_name)
+    progress["files_total"] = len(file_paths)
+    progress["stage"] = "indexing"
+    skipped_paths = set()
+    try:
+        stats = await run_ingestion_pipeline(
+            file_paths, repo_name, local_repo_path, run_id, collection_name, stats=progress, skipped_paths=skipped_paths
+        )
+    except BaseException as e:
+        # 실패하거나 취소되면 이번 실행에서 새로 만든 청크를 정리 (같은 ID로 다시 저장한 기존 청크는 유지)
+        try:
+            created_ids = await asyncio.to_thread(chunk_registry.created_chunk_ids, repo_name, run_id)
+            await _delete_chunk_ids(collection_name, created_ids)
+            await asyncio.to_thread(lexical_index.delete_documents, created_ids)
+            await asyncio.to_thread(chunk_registry.delete_chunks, created_ids)
+        except Exception as cleanup_error:
+            logger.error(f"중단된 인덱싱 실행 {run_id}의 청크 정리 실패: {cleanup_error}")
+        if isinstance(e, Exception):
+            raise IndexingError(f"청크 임베딩 및 벡터 DB 저장 중 오류 발생: {e}")
+        raise
+
+    logger.info(
+        f"총 {stats['files_scanned']}개 파일에서 {stats['chunks_created']}개 청크 저장 완료 "
+        f"(캐시 적중 {stats['embedding_cache']['cache_hits']}개, 미스 {stats['embedding_cache']['cache_misses']}개)."
+    )
+
+    progress["stage"] = "cleanup"
+    try:
+        if skipped_paths:
+            # 청크 수 제한으로 건너뛴 파일은 새 청크가 없으므로 이전 청크를 지우지 않고 유지
+            logger.warning(f"청크 수 제한으로 건너뛴 파일 {len(skipped_paths)}개는 이전 인덱싱의 청크를 유지합니다.")
+            await asyncio.to_thread(chunk_registry.retain_file_chunks, repo_name, run_id, skipped_paths)
+        await _delete_stale_chunks(collection_name, repo_name, run_id, None if mode == "full" else removed_paths | retry_paths)
+        if mode == "full":
+            await delete_documents_from_collection(LEGACY_COLLECTION_NAME, where={"repo_name": repo_name})
+    except Exception as e:
+        raise IndexingError(f"벡터 DB 기존 청크 삭제 중 오류 발생: {e}")
+
+    # 청크 수 제한으로 건너뛴 파일은 last_commit 이후 diff에 나오지 않으므로 따로 기록하여 다음 실행에서 다시 시도
+    save_index_state(repo_name, {
+        "repo_url": repo_url,
+        "branch": branch,
+        "last_commit": head_commit,
+        "skipped_paths": sorted(skipped_paths),
+        "indexed_at": datetime.now(timezone.utc).isoformat()
+    })
+    progress["stage"] = "done"
+
+    if not stats["chunks_created"] and mode == "full":
+        return {
+            "message": f"레포지토리 {repo_name}에서 처리할 유효한 청크가 없습니다.",
+            "repo_path": str(local_repo_path),
+            "mode": mode,
+            "commit": head_commit,
+            "total_files": len(file_paths),
+            "total_chunks": 0
+        }
+
+    return {
+        "message": f"레포지토리 {repo_name} 처리, 청크 생성, 임베딩 및 벡터 DB 저장 완료",
+        "repo_path": str(local_repo_path),
+        "mode": mode,
+        "commit": head_commit,
+        "total_files": len(file_paths),
+        "total_chunks_processed": stats["vectors_written"],
+        "files_over_budget": stats["files_over_budget"],
+        "deleted_files": len(removed_paths),
+        "embedding_cache": stats["embedding_cache"]
+    }
+
+async def drop_repository_index(repo_name: str) -> bool:
+    """
+    레포지토리의 인덱스를 삭제합니다. 컬렉션을 통째로 지우므로 청크 수와 관계없이 빠릅니다.
+    진행 중인 인덱싱이 있으면 끝날 때까지 기다립니다. 삭제할 인덱스가 있었으면 True를 반환합니다.
+    """
+    async with _get_repo_lock(repo_name):
+        dropped = await drop_collection(get_repo_collection_name(repo_name))
+        await delete_documents_from_collection(LEGACY_COLLECTION_NAME, where={"repo_name": repo_name})
+        dropped = await asyncio.to_thread(lexical_index.drop_repo, repo_name) or dropped
+        dropped = await asyncio.to_thread(chunk_registry.drop_repo, repo_name) or dropped
+        dropped = await asyncio.to_thread(snapshot_service.unload_snapshot, repo_name) or dropped
+        had_state = load_index_state(repo_name) is not None
+        delete_index_state(repo_name)
+        invalidate_repo(repo_name)
+    logger.info(f"레포지토리 {repo_name} 인덱스 삭제 완료.")
+    return dropped or had_state
+
+async def export_repository_snapshot(repo_name: str, output_dir: Path = None) -> dict:
+    """
+    레포지토리 인덱스를 스냅샷 번들로 내보냅니다. (snapshot_service 참고)
+    진행 중인 인덱싱이 있으면 끝날 때까지 기다린 뒤, 인덱스가 바뀌지 않는 상태에서 내보냅니다.
+    """
+    async with _get_repo_lock(repo_name):
+        return await snapshot_service.export_snapshot(repo_name, load_index_state(repo_name), output_dir)
@@ -0,0 +1,130 @@
+# backend/app/services/ingest_pool.py
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.services.code_parser import chunk_content, summarize_file
+from app.services.github_service import LARGE_FILE_SIZE_BYTES, map_file, read_file_content
+from app.services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 파일 읽기/디코딩/언어 판별/청크 분할/해시 계산을 실행할 프로세스 수 (0이면 프로세스 풀 없이 스레드 하나에서 실행)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+# 프로세스에 한 번에 넘길 파일 수 (작을수록 부하가 고르게 분산되고, 클수록 프로세스 간 통신 비용이 줄어듦)
+INGEST_FILES_PER_TASK = int(os.getenv("INGEST_FILES_PER_TASK", "32"))
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    """프로세스 풀을 처음 사용할 때 만듭니다."""
+    global _executor
+    if INGEST_WORKERS <= 0:
+        return None
+    if _executor is None:
+        # 스레드가 많은 서버 프로세스를 fork하면 자식에서 락이 걸린 채로 복사될 수 있으므로 spawn 사용
+        _executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"파일 처리 프로세스 풀 시작 (프로세스 {INGEST_WORKERS}개, 작업당 파일 {INGEST_FILES_PER_TASK}개).")
+    return _executor
+
+def process_file_batch(
+    file_paths: list[Path],
+    repo_name: str,
+    repo_root: Path
+) -> tuple[list[list[dict] | None], float, float]:
+    """
+    [워커 프로세스] 파일들을 읽어 청크로 나누고, 청크마다 내용 해시(content_hash)를 기록합니다.
+    LARGE_FILE_SIZE_BYTES보다 큰 파일은 전체를 읽지 않고 메모리 매핑으로 훑어 요약 청크만 만듭니다.
+    파일별 청크 리스트(읽기 실패 또는 빈 파일이면 None)를 입력 순서대로 반환하며,
+    읽기/청크 분할에 걸린 시간(초)을 함께 반환합니다. (큰 파일은 읽기와 요약이 함께 일어나므로 청크 분할 시간에 포함)
+    """
+    results = []
+    read_seconds = 0.0
+    chunk_seconds = 0.0
+    for path in file_paths:
+        started = time.perf_counter()
+        try:
+            large = path.stat().st_size > LARGE_FILE_SIZE_BYTES
+        except OSError as e:
+            logger.error(f"파일 {path} 읽기 오류: {e}")
+            results.append(None)
+            continue
+        if large:
+            try:
+                with map_file(path) as data:
+                    chunks = summarize_file(data, path, repo_name, repo_root, "large")
+            except (OSError, ValueError) as e:
+                logger.error(f"파일 {path} 읽기 오류: {e}")
+                chunks = None
+        else:
+            content = read_file_content(path)
+            read_seconds += time.perf_counter() - started
+            if not content or not content.strip():
+                results.append(None)
+                continue
+            started = time.perf_counter()
+            chunks = chunk_content(content, path, repo_name, repo_root)
+        if not chunks:
+            chunk_seconds += time.perf_counter() - started
+            results.append(None)
+            continue
+
+        for chunk in chunks:
+            chunk["metadata"]["content_hash"] = hashlib.sha1(chunk["content"].encode("utf-8")).hexdigest()
+        chunk_seconds += time.perf_counter() - started
+        results.append(chunks)
+    return results, read_seconds, chunk_seconds
+
+async def iter_file_chunks(
+    file_paths: list[Path],
+    repo_name: str,
+    repo_root: Path
+) -> AsyncIterator[tuple[Path, list[dict] | None]]:
+    """
+    파일들을 INGEST_FILES_PER_TASK개씩 묶어 프로세스 풀에서 처리하고, (파일 경로, 청크 리스트)를 입력 순서대로 내보냅니다.
+    워커 수의 두 배만큼만 미리 제출하므로 소비하는 쪽(임베딩 단계)이 느리면 처리도 함께 멈춥니다.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    batches = iter([
+        file_paths[i:i + INGEST_FILES_PER_TASK] for i in range(0, len(file_paths), INGEST_FILES_PER_TASK)
+    ])
+    window = max(1, INGEST_WORKERS) * 2
+    pending = deque()
+
+    def submit_next():
+        batch = next(batches, None)
+        if batch is not None:
+            pending.append((batch, loop.run_in_executor(executor, process_file_batch, batch, repo_name, repo_root)))
+
+    for _ in range(window):
+        submit_next()
+    try:
+        while pending:
+            batch, future = pending.popleft()
+            results, read_seconds, chunk_seconds = await future
+            submit_next()
+            STAGE_SECONDS.labels("read").observe(read_seconds)
+            STAGE_SECONDS.labels("chunk").observe(chunk_seconds)
+            for path, chunks in zip(batch, results):
+                yield path, chunks
+    finally:
+        # 중간에 실패/취소되면 아직 시작하지 않은 작업은 취소
+        for _, future in pending:
+            future.cancel()
+
+def shutdown():
+    """프로세스 풀을 종료합니다."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
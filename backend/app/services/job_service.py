@@ -0,0 +1,239 @@
+# backend/app/services/job_service.py
+
+import os
+import json
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.services.indexing_service import IndexingError, index_repository
+from app.services.metrics import INDEXING_JOB_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+GITHUB_PAT = os.getenv("GITHUB_PAT")
+# 인덱싱 작업 상태를 저장하는 경로 (서버 재시작 후에도 조회/재개 가능)
+JOBS_DIR = Path("./data/jobs")
+# 동시에 실행할 인덱싱 작업 수
+INDEXING_MAX_CONCURRENCY = int(os.getenv("INDEXING_MAX_CONCURRENCY", "2"))
+# 실행 중인 작업의 진행 상황을 파일에 기록하는 주기 (초)
+JOB_PERSIST_INTERVAL = 2.0
+# 끝난 작업(성공/실패/취소)을 보관할 최대 개수와 기간 (일). 0이면 해당 제한을 두지 않음
+JOB_RETENTION_MAX = int(os.getenv("JOB_RETENTION_MAX", "200"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+# 작업 상태
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IndexingJobScheduler:
+    """
+    레포지토리 인덱싱 작업을 큐에 넣고 asyncio 워커 풀에서 실행하는 스케줄러.
+    같은 레포/브랜치에 대한 중복 요청은 하나의 작업으로 합치고, 작업 상태는 JSON 파일로 유지합니다.
+    """
+
+    def __init__(self, max_concurrency: int = INDEXING_MAX_CONCURRENCY, jobs_dir: Path = JOBS_DIR):
+        self.max_concurrency = max_concurrency
+        self.jobs_dir = jobs_dir
+        self.jobs: dict[str, dict] = {}
+        self._queue: asyncio.Queue = None
+        self._workers: list[asyncio.Task] = []
+        self._running_tasks: dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        """저장된 작업 상태를 불러오고 워커를 시작합니다. 끝나지 않은 작업은 다시 큐에 넣습니다."""
+        self._queue = asyncio.Queue()
+        self._load_jobs()
+        self._prune_jobs()
+        for job in sorted(self.jobs.values(), key=lambda job: job["created_at"]):
+            if job["status"] in ACTIVE_JOB_STATUSES:
+                logger.info(f"서버 재시작 전 끝나지 않은 인덱싱 작업 {job['job_id']}를 다시 큐에 넣습니다.")
+                job["status"] = JOB_QUEUED
+                self._save_job(job)
+                self._queue.put_nowait(job["job_id"])
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_concurrency)]
+        logger.info(f"인덱싱 작업 스케줄러 시작 (워커 {self.max_concurrency}개).")
+
+    async def stop(self):
+        """워커를 중지합니다. 실행 중이던 작업은 다음 시작 시 다시 실행됩니다."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("인덱싱 작업 스케줄러 중지.")
+
+    def submit(self, repo_url: str, repo_name: str, branch: str = "main", incremental: bool = True) -> tuple[dict, bool]:
+        """
+        인덱싱 작업을 큐에 넣습니다.
+        같은 레포/브랜치에 대해 대기 중이거나 실행 중인 작업이 있으면 그 작업을 반환합니다.
+        (작업, 새로 생성되었는지 여부)를 반환합니다.
+        """
+        for job in self.jobs.values():
+            if job["repo_name"] == repo_name and job["branch"] == branch and job["status"] in ACTIVE_JOB_STATUSES:
+                logger.info(f"레포지토리 {repo_name}({branch})에 대한 작업 {job['job_id']}가 이미 있어 새 작업을 만들지 않습니다.")
+                return job, False
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "repo_url": repo_url,
+            "repo_name": repo_name,
+            "branch": branch,
+            "incremental": incremental,
+            "status": JOB_QUEUED,
+            "progress": {"stage": JOB_QUEUED},
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None
+        }
+        self.jobs[job["job_id"]] = job
+        self._save_job(job)
+        self._queue.put_nowait(job["job_id"])
+        logger.info(f"레포지토리 {repo_name}({branch}) 인덱싱 작업 {job['job_id']} 등록.")
+        return job, True
+
+    def get(self, job_id: str) -> dict | None:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self, status: str = None) -> list[dict]:
+        jobs = [job for job in self.jobs.values() if status is None or job["status"] == status]
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+    def queue_depth(self) -> int:
+        """대기 중인 작업 수를 반환합니다."""
+        return sum(1 for job in self.jobs.values() if job["status"] == JOB_QUEUED)
+
+    def cancel(self, job_id: str) -> dict | None:
+        """
+        작업을 취소합니다. 대기 중이면 실행하지 않고, 실행 중이면 태스크를 중단합니다.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == JOB_QUEUED:
+            self._finish(job, JOB_CANCELLED)
+        elif job["status"] == JOB_RUNNING:
+            task = self._running_tasks.get(job_id)
+            if task is not None:
+                task.cancel()
+        return job
+
+    async def _worker(self, worker_index: int):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            # 대기 중에 취소된 작업은 건너뜀
+            if job is None or job["status"] != JOB_QUEUED:
+                continue
+            await self._run_job(job)
+
+    async def _run_job(self, job: dict):
+        job["status"] = JOB_RUNNING
+        job["started_at"] = _now()
+        job["progress"] = {"stage": "starting"}
+        self._save_job(job)
+        logger.info(f"인덱싱 작업 {job['job_id']} 시작: {job['repo_name']}({job['branch']})")
+
+        task = asyncio.create_task(index_repository(
+            job["repo_url"],
+            job["repo_name"],
+            job["branch"],
+            GITHUB_PAT,
+            job["incremental"],
+            progress=job["progress"]
+        ))
+        self._running_tasks[job["job_id"]] = task
+        persister = asyncio.create_task(self._persist_periodically(job))
+        try:
+            job["result"] = await task
+            self._finish(job, JOB_SUCCEEDED)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # 워커 자체가 중지됨 (서버 종료) -> 다음 시작 때 다시 실행되도록 상태 유지
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            self._finish(job, JOB_CANCELLED)
+        except IndexingError as e:
+            self._finish(job, JOB_FAILED, str(e))
+        except Exception as e:
+            logger.error(f"인덱싱 작업 {job['job_id']} 중 예상치 못한 오류 발생: {e}")
+            self._finish(job, JOB_FAILED, f"예상치 못한 오류: {e}")
+        finally:
+            persister.cancel()
+            self._running_tasks.pop(job["job_id"], None)
+
+    async def _persist_periodically(self, job: dict):
+        """실행 중인 작업의 진행 상황을 주기적으로 파일에 기록합니다."""
+        while True:
+            await asyncio.sleep(JOB_PERSIST_INTERVAL)
+            self._save_job(job)
+
+    def _finish(self, job: dict, status: str, error: str = None):
+        job["status"] = status
+        job["error"] = error
+        job["finished_at"] = _now()
+        self._save_job(job)
+        logger.info(f"인덱싱 작업 {job['job_id']} 종료: {status}" + (f" ({error})" if error else ""))
+        self._prune_jobs()
+
+    def _prune_jobs(self):
+        """
+        끝난 작업 중 JOB_RETENTION_DAYS보다 오래되었거나 최근 JOB_RETENTION_MAX개를 넘는 작업을
+        메모리와 상태 파일에서 삭제합니다. 대기 중이거나 실행 중인 작업은 삭제하지 않습니다.
+        """
+        finished = sorted(
+            (job for job in self.jobs.values() if job["status"] not in ACTIVE_JOB_STATUSES),
+            key=lambda job: job.get("finished_at") or job["created_at"],
+            reverse=True
+        )
+        expired = finished[JOB_RETENTION_MAX:] if JOB_RETENTION_MAX > 0 else []
+        if JOB_RETENTION_DAYS > 0:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=JOB_RETENTION_DAYS)).isoformat()
+            expired += [job for job in finished[:len(finished) - len(expired)] if (job.get("finished_at") or job["created_at"]) < cutoff]
+        for job in expired:
+            self.jobs.pop(job["job_id"], None)
+            try:
+                (self.jobs_dir / f"{job['job_id']}.json").unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"인덱싱 작업 {job['job_id']} 상태 파일 삭제 실패: {e}")
+        if expired:
+            logger.info(f"보관 기간/개수를 넘은 인덱싱 작업 {len(expired)}개를 삭제했습니다.")
+
+    def _save_job(self, job: dict):
+        try:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            job_path = self.jobs_dir / f"{job['job_id']}.json"
+            tmp_path = job_path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False, indent=2)
+            tmp_path.replace(job_path)
+        except Exception as e:
+            logger.error(f"인덱싱 작업 {job['job_id']} 상태 저장 실패: {e}")
+
+    def _load_jobs(self):
+        if not self.jobs_dir.exists():
+            return
+        for job_path in self.jobs_dir.glob("*.json"):
+            try:
+                with open(job_path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+                self.jobs[job["job_id"]] = job
+            except Exception as e:
+                logger.warning(f"인덱싱 작업 상태 파일 {job_path} 읽기 실패: {e}")
+
+
+job_scheduler = IndexingJobScheduler()
+INDEXING_JOB_QUEUE_DEPTH.set_function(job_scheduler.queue_depth)
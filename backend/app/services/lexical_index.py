@@ -0,0 +1,170 @@
+# backend/app/services/lexical_index.py
+
+import os
+import re
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any
+
+from app.services import chunk_registry
+from app.services.metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+# 청크 키워드 검색용 역색인 SQLite 파일 경로 (모든 레포지토리가 함께 사용)
+LEXICAL_INDEX_PATH = Path(os.getenv("LEXICAL_INDEX_PATH", "./data/lexical_index.sqlite3"))
+# 순위 융합(Reciprocal Rank Fusion) 상수. 클수록 하위 순위 결과의 영향이 커짐
+RRF_K = 60
+# SQLite 변수 개수 제한을 넘지 않도록 한 번에 삭제할 청크 수
+_DELETE_BATCH_SIZE = 500
+
+# 단어 토큰: 식별자가 쪼개지지 않도록 '_'도 토큰 문자로 취급
+_WORD_PATTERN = re.compile(r'\w+')
+# 임베딩 없이 키워드 검색만으로 답할 수 있는 "식별자 하나" 형태의 질문 (예: get_repo_files, Foo.bar, parseArgs())
+_IDENTIFIER_QUERY_PATTERN = re.compile(r'^[A-Za-z_$][\w$]*(?:(?:\.|::|->)[A-Za-z_$][\w$]*)*(?:\(\))?$')
+_CODE_LIKE_PATTERN = re.compile(r'[_.:(]|[a-z0-9][A-Z]')
+
+_connection = None
+_has_trigram = False
+_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """역색인 DB 연결을 처음 사용할 때 열고 테이블을 준비합니다."""
+    global _connection, _has_trigram
+    if _connection is None:
+        LEXICAL_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(LEXICAL_INDEX_PATH, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # 메타데이터는 청크 메타데이터 저장소(chunk_registry)에 있으므로 여기에는 검색에 필요한 내용만 저장
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id INTEGER PRIMARY KEY,"
+            " chunk_id TEXT NOT NULL UNIQUE,"
+            " repo_name TEXT NOT NULL,"
+            " content TEXT NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_chunks_repo ON chunks(repo_name)")
+        # BM25 단어 검색용 FTS5 테이블 (내용은 chunks 테이블을 참조)
+        connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+            "content, content='chunks', content_rowid='id', tokenize=\"unicode61 tokenchars '_'\")"
+        )
+        fts_tables = ["chunks_fts"]
+        # 식별자 일부/에러 문자열 같은 부분 문자열 검색용 trigram 테이블 (SQLite 3.34 이상)
+        try:
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_trigram USING fts5("
+                "content, content='chunks', content_rowid='id', tokenize='trigram')"
+            )
+            fts_tables.append("chunks_trigram")
+            _has_trigram = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite trigram 토크나이저를 사용할 수 없어 부분 문자열 검색을 끕니다: {e}")
+
+        insert_statements = "".join(
+            f"INSERT INTO {table}(rowid, content) VALUES (new.id, new.content);" for table in fts_tables
+        )
+        delete_statements = "".join(
+            f"INSERT INTO {table}({table}, rowid, content) VALUES ('delete', old.id, old.content);" for table in fts_tables
+        )
+        connection.execute(f"CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN {insert_statements} END")
+        connection.execute(f"CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN {delete_statements} END")
+        connection.commit()
+        _connection = connection
+        logger.info(f"키워드 검색 인덱스 {LEXICAL_INDEX_PATH} 열기 완료.")
+    return _connection
+
+def add_documents(repo_name: str, ids: list[str], documents: list[str]):
+    """벡터 DB에 저장한 청크를 같은 ID로 역색인에도 추가합니다. 이미 있는 ID는 덮어씁니다."""
+    rows = [(chunk_id, repo_name, document) for chunk_id, document in zip(ids, documents)]
+    with _lock, track_stage("lexical_write"):
+        connection = _get_connection()
+        # REPLACE는 DELETE 트리거를 실행하지 않으므로 기존 행을 먼저 지움
+        connection.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(row[0],) for row in rows])
+        connection.executemany("INSERT INTO chunks (chunk_id, repo_name, content) VALUES (?, ?, ?)", rows)
+        connection.commit()
+
+def delete_documents(ids: list[str]):
+    """청크를 ID로 삭제합니다."""
+    with _lock:
+        connection = _get_connection()
+        for i in range(0, len(ids), _DELETE_BATCH_SIZE):
+            batch = ids[i:i + _DELETE_BATCH_SIZE]
+            connection.execute(f"DELETE FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch)
+        connection.commit()
+
+def drop_repo(repo_name: str) -> bool:
+    """레포지토리의 모든 청크를 역색인에서 삭제합니다. 삭제한 청크가 있었으면 True를 반환합니다."""
+    with _lock:
+        connection = _get_connection()
+        deleted = connection.execute("DELETE FROM chunks WHERE repo_name = ?", (repo_name,)).rowcount
+        connection.commit()
+    return deleted > 0
+
+def has_repo_documents(repo_name: str) -> bool:
+    """레포지토리 청크가 역색인에 하나라도 있는지 확인합니다."""
+    with _lock:
+        connection = _get_connection()
+        row = connection.execute("SELECT 1 FROM chunks WHERE repo_name = ? LIMIT 1", (repo_name,)).fetchone()
+    return row is not None
+
+def is_identifier_query(query_text: str) -> bool:
+    """질문이 함수/클래스 이름 같은 식별자 하나뿐인지 확인합니다."""
+    query_text = query_text.strip()
+    return bool(_IDENTIFIER_QUERY_PATTERN.match(query_text) and _CODE_LIKE_PATTERN.search(query_text))
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+def _run_search(connection: sqlite3.Connection, table: str, match: str, repo_name: str | None, n_results: int) -> list[tuple]:
+    repo_filter = " AND c.repo_name = ?" if repo_name else ""
+    params = [match, repo_name, n_results] if repo_name else [match, n_results]
+    return connection.execute(
+        f"SELECT c.chunk_id, c.content, bm25({table}) AS score"
+        f" FROM {table} JOIN chunks c ON c.id = {table}.rowid"
+        f" WHERE {table} MATCH ?{repo_filter}"
+        f" ORDER BY score LIMIT ?",
+        params
+    ).fetchall()
+
+def search(query_text: str, repo_name: str = None, n_results: int = 5) -> List[Dict[str, Any]]:
+    """
+    BM25로 질문의 단어가 들어 있는 청크를 찾습니다.
+    단어 단위로 찾지 못하면 (식별자 일부, 에러 메시지 등) trigram 부분 문자열 검색으로 다시 찾습니다.
+    결과는 관련도 순이며 score는 BM25 점수(낮을수록 관련도 높음)입니다.
+    """
+    words = list(dict.fromkeys(_WORD_PATTERN.findall(query_text)))
+    if not words:
+        return []
+
+    with _lock, track_stage("lexical_query"):
+        connection = _get_connection()
+        rows = _run_search(connection, "chunks_fts", " OR ".join(_fts_phrase(word) for word in words), repo_name, n_results)
+        phrase = query_text.strip()
+        if not rows and _has_trigram and len(phrase) >= 3:
+            rows = _run_search(connection, "chunks_trigram", _fts_phrase(phrase), repo_name, n_results)
+
+    results = [{"id": chunk_id, "content": content, "score": score} for chunk_id, content, score in rows]
+    return chunk_registry.hydrate_results(results)
+
+def fuse_rankings(rankings: List[List[Dict[str, Any]]], n_results: int) -> List[Dict[str, Any]]:
+    """
+    여러 검색 결과 목록(벡터 검색, 키워드 검색)을 Reciprocal Rank Fusion으로 합칩니다.
+    점수 척도가 서로 달라도 순위만 사용하므로 별도 정규화가 필요 없습니다.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            entry = fused.get(result["id"])
+            if entry is None:
+                entry = fused[result["id"]] = {**result, "fusion_score": 0.0}
+            else:
+                # 같은 청크가 양쪽에서 나오면 거리/점수 정보를 모두 유지
+                for key, value in result.items():
+                    entry.setdefault(key, value)
+            entry["fusion_score"] += 1.0 / (RRF_K + rank + 1)
+    return sorted(fused.values(), key=lambda result: result["fusion_score"], reverse=True)[:n_results]
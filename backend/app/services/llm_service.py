@@ -1,23 +1,29 @@
 #backend/app/services/llm_service.py
 
 import os
+import time
 import logging
-from openai import OpenAI, APIStatusError
-from typing import List, Dict, Any
+from openai import AsyncOpenAI, APIStatusError
+from typing import List, Dict, Any, AsyncIterator
 from fastapi import HTTPException 
+from app.services.service_container import get_openai_client
+from app.services.metrics import OPENAI_REQUESTS, STAGE_SECONDS, record_openai_usage, track_stage
 
 logger = logging.getLogger(__name__)
-client = OpenAI()
 
 LLM_MODEL = 'gpt-4o-mini'
 
-async def generate_response_from_context(
-        query : str,
-        context_chunks : List[Dict[str, Any]],
-        model : str = LLM_MODEL
-) -> str:
+
+def _get_client() -> AsyncOpenAI:
     """
-    주어진 질문과 컨텍스트 청크를 바탕으로 AI 모델에게 답변을 생성하도록 요청
+    공유 OpenAI 클라이언트 (처음 사용할 때 생성, API 키 없이도 서버와 로컬 인덱싱은 동작하도록).
+    비동기 클라이언트를 사용하여 답변 생성 중에도 이벤트 루프가 다른 요청을 처리할 수 있도록 함
+    """
+    return get_openai_client()
+
+def _build_messages(query: str, context_chunks: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    질문과 컨텍스트 청크로 AI 모델에 보낼 메시지를 만듭니다.
     """
     if not context_chunks:
         logger.warning("컨텍스트 청크가 없어 AI 답변 생성에 제약이 있을 수 있습니다.")
@@ -52,22 +58,80 @@ async def generate_response_from_context(
         {"role": "user", "content": f"다음 컨텍스트를 사용하여 내 질문에 답변해 주세요:\n\n컨텍스트:\n{context_text}\n\n질문: {query}"}
     ]
 
+    return messages
+
+async def generate_response_from_context(
+        query : str,
+        context_chunks : List[Dict[str, Any]],
+        model : str = LLM_MODEL
+) -> str:
+    """
+    주어진 질문과 컨텍스트 청크를 바탕으로 AI 모델에게 답변을 생성하도록 요청
+    """
+    messages = _build_messages(query, context_chunks)
+
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.7, # 창의성 조절 (0.0은 가장 보수적, 1.0은 가장 창의적)
-            max_tokens=1000 # AI 답변의 최대 길이
-        )
+        with track_stage("generate"):
+            response = await _get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.7, # 창의성 조절 (0.0은 가장 보수적, 1.0은 가장 창의적)
+                max_tokens=1000 # AI 답변의 최대 길이
+            )
+        record_openai_usage("chat", model, response.usage)
         ai_response_content = response.choices[0].message.content
         logger.info(f"AI 모델({model})로부터 답변 생성 완료. 사용 토큰: {response.usage.total_tokens}")
         return ai_response_content
 
     except APIStatusError as e:
+        OPENAI_REQUESTS.labels("chat", model, "error").inc()
         logger.error(f"AI 모델 API 호출 중 오류 발생 (상태 코드: {e.status_code}): {e.response.json()}")
         if e.status_code == 429:
             raise HTTPException(status_code=500, detail=f"AI 모델 할당량/Rate Limit 오류: {e.response.json().get('error', {}).get('message', '알 수 없는 오류')}")
         raise HTTPException(status_code=500, detail=f"AI 모델 API 오류: {e.response.json().get('error', {}).get('message', '알 수 없는 오류')}")
     except Exception as e:
+        OPENAI_REQUESTS.labels("chat", model, "error").inc()
         logger.error(f"AI 모델 답변 생성 중 예상치 못한 오류 발생: {e}")
-        raise HTTPException(status_code=500, detail=f"AI 모델 답변 생성 오류: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"AI 모델 답변 생성 오류: {e}")
+
+async def stream_response_from_context(
+        query : str,
+        context_chunks : List[Dict[str, Any]],
+        model : str = LLM_MODEL
+) -> AsyncIterator[str]:
+    """
+    주어진 질문과 컨텍스트 청크를 바탕으로 AI 답변을 스트리밍으로 생성하여 토큰 조각을 차례로 반환합니다.
+    호출한 쪽이 중간에 반복을 멈추면 (클라이언트 연결 종료 등) 업스트림 요청도 바로 닫습니다.
+    """
+    messages = _build_messages(query, context_chunks)
+
+    started = time.perf_counter()
+    try:
+        stream = await _get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7, # 창의성 조절 (0.0은 가장 보수적, 1.0은 가장 창의적)
+            max_tokens=1000, # AI 답변의 최대 길이
+            stream=True,
+            stream_options={"include_usage": True} # 마지막 청크에 토큰 사용량 포함
+        )
+    except APIStatusError as e:
+        OPENAI_REQUESTS.labels("chat", model, "error").inc()
+        logger.error(f"AI 모델 API 호출 중 오류 발생 (상태 코드: {e.status_code}): {e.response.text}")
+        raise HTTPException(status_code=500, detail=f"AI 모델 API 오류 (상태 코드: {e.status_code})")
+    except Exception as e:
+        OPENAI_REQUESTS.labels("chat", model, "error").inc()
+        logger.error(f"AI 모델 스트리밍 요청 중 예상치 못한 오류 발생: {e}")
+        raise HTTPException(status_code=500, detail=f"AI 모델 답변 생성 오류: {e}")
+
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                record_openai_usage("chat", model, chunk.usage)
+                logger.info(f"AI 모델({model})로부터 스트리밍 답변 생성 완료. 사용 토큰: {chunk.usage.total_tokens}")
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # 정상 종료/중단 모두 HTTP 연결을 닫아 업스트림 생성을 취소
+        await stream.close()
+        STAGE_SECONDS.labels("generate").observe(time.perf_counter() - started)
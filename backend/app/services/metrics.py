@@ -0,0 +1,118 @@
+# backend/app/services/metrics.py
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+from app.services import query_cache
+
+logger = logging.getLogger(__name__)
+
+# 응답에 Server-Timing 헤더로 단계별 소요 시간을 붙일지 여부
+SERVER_TIMING_HEADERS = os.getenv("SERVER_TIMING_HEADERS", "false").lower() in ("1", "true", "yes")
+
+# 단계별 소요 시간 (clone, scan, read, chunk, embed, vector_write, lexical_write, vector_query, lexical_query, retrieve, generate)
+STAGE_SECONDS = Histogram(
+    "repomind_stage_duration_seconds",
+    "인덱싱/질의 단계별 소요 시간",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "repomind_http_request_duration_seconds",
+    "HTTP 요청 처리 시간",
+    ["method", "route", "status"]
+)
+# OpenAI API 호출 수와 사용 토큰 수 (response.usage 기준)
+OPENAI_REQUESTS = Counter(
+    "repomind_openai_requests_total",
+    "OpenAI API 호출 수",
+    ["api", "model", "outcome"]
+)
+OPENAI_TOKENS = Counter(
+    "repomind_openai_tokens_total",
+    "OpenAI API 사용 토큰 수",
+    ["api", "model", "kind"]
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "repomind_embedding_cache_lookups_total",
+    "임베딩 캐시 조회 결과별 텍스트 수",
+    ["result"]
+)
+# 인덱싱 파이프라인 단계 사이 큐에 쌓인 배치 수
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "repomind_pipeline_queue_depth",
+    "인덱싱 파이프라인 큐에 대기 중인 배치 수",
+    ["queue"]
+)
+INDEXING_JOB_QUEUE_DEPTH = Gauge(
+    "repomind_indexing_jobs_queued",
+    "대기 중인 인덱싱 작업 수"
+)
+
+# 현재 요청에서 측정한 (단계, 소요 시간) 목록. Server-Timing 헤더를 켠 경우에만 설정됨
+_request_timings: ContextVar[list | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """with 블록의 소요 시간을 단계별 히스토그램과 현재 요청의 타이밍 목록에 기록합니다."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def record_openai_usage(api: str, model: str, usage):
+    """OpenAI 응답의 usage에서 토큰 수를 집계합니다."""
+    OPENAI_REQUESTS.labels(api, model, "success").inc()
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens:
+        OPENAI_TOKENS.labels(api, model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        OPENAI_TOKENS.labels(api, model, "completion").inc(completion_tokens)
+
+def start_request_timings() -> list:
+    """현재 요청의 단계별 타이밍 기록을 시작합니다."""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+def format_server_timing(timings: list, total: float) -> str:
+    """(단계, 초) 목록을 Server-Timing 헤더 값으로 만듭니다. 같은 단계는 합산합니다."""
+    totals: dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    parts = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class QueryCacheCollector:
+    """쿼리 캐시(임베딩/검색/답변)의 적중·미스 횟수와 항목 수를 수집 시점에 읽어 노출합니다."""
+
+    def collect(self):
+        hits = CounterMetricFamily("repomind_query_cache_hits", "쿼리 캐시 적중 횟수", labels=["cache"])
+        misses = CounterMetricFamily("repomind_query_cache_misses", "쿼리 캐시 미스 횟수", labels=["cache"])
+        size = GaugeMetricFamily("repomind_query_cache_entries", "쿼리 캐시 항목 수", labels=["cache"])
+        for name, stats in query_cache.get_cache_stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            size.add_metric([name], stats["size"])
+        yield hits
+        yield misses
+        yield size
+
+
+REGISTRY.register(QueryCacheCollector())
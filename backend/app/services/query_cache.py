@@ -0,0 +1,105 @@
+# backend/app/services/query_cache.py
+
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable
+
+logger = logging.getLogger(__name__)
+
+# 캐시 항목 유효 시간 (초)과 최대 항목 수
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+
+
+class TTLCache:
+    """
+    유효 시간(TTL)과 최대 항목 수(LRU) 제한이 있는 간단한 인메모리 캐시.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 1단계: 쿼리 텍스트 -> 쿼리 임베딩
+query_embedding_cache = TTLCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS)
+# 2단계: (레포, 인덱스 세대, 검색 모드, 쿼리 임베딩 또는 텍스트, n_results) -> 검색 결과
+retrieval_cache = TTLCache(RETRIEVAL_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS)
+# 3단계: (쿼리, 검색된 청크 ID들, 모델) -> AI 답변
+answer_cache = TTLCache(ANSWER_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS)
+
+# 레포지토리별 인덱스 세대. 재인덱싱/삭제 시 증가시켜 이전 검색 결과 캐시를 무효화
+_repo_generations: dict[str, int] = {}
+# 전체 레포 검색(repo_name 없음)용 세대. 어떤 레포든 바뀌면 증가
+_global_generation = 0
+
+
+def invalidate_repo(repo_name: str):
+    """레포지토리 인덱스가 바뀌었을 때 해당 레포(및 전체 검색)의 검색 결과 캐시를 무효화합니다."""
+    global _global_generation
+    _repo_generations[repo_name] = _repo_generations.get(repo_name, 0) + 1
+    _global_generation += 1
+    logger.info(f"레포지토리 {repo_name}의 쿼리 캐시 무효화 (세대 {_repo_generations[repo_name]}).")
+
+def _generation(repo_name: str | None) -> int:
+    if repo_name is None:
+        return _global_generation
+    return _repo_generations.get(repo_name, 0)
+
+def _query_digest(query: list[float] | str) -> str:
+    return hashlib.sha1(repr(query).encode("utf-8")).hexdigest()
+
+def query_embedding_key(model: str, query_text: str) -> tuple:
+    return (model, query_text)
+
+def retrieval_key(repo_name: str | None, query: list[float] | str, n_results: int, mode: str = "vector") -> tuple:
+    """벡터 검색은 쿼리 임베딩, 키워드/하이브리드 검색은 쿼리 텍스트를 키로 사용합니다."""
+    return (repo_name, _generation(repo_name), mode, _query_digest(query), n_results)
+
+def answer_key(query_text: str, chunk_ids: list[str], model: str) -> tuple:
+    return (model, query_text, tuple(chunk_ids))
+
+def get_cache_stats() -> dict:
+    """캐시별 항목 수와 적중/미스 횟수를 반환합니다."""
+    return {
+        name: {"size": len(cache), "hits": cache.hits, "misses": cache.misses}
+        for name, cache in (
+            ("query_embedding", query_embedding_cache),
+            ("retrieval", retrieval_cache),
+            ("answer", answer_cache),
+        )
+    }
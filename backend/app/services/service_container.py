@@ -0,0 +1,76 @@
+# backend/app/services/service_container.py
+
+import os
+import logging
+import threading
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# 외부 서비스 클라이언트를 한곳에서 처음 사용할 때 만들고, 앱 종료 시(lifespan) 닫습니다.
+# 임포트 시점에는 아무것도 열지 않으므로 API 키나 벡터 DB 없이도 서버가 빠르게 시작됩니다.
+
+# ChromaDB 데이터 경로 (docker-compose.yml의 volumes 설정과 일치해야 함)
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+# OpenAI API 연결 풀 설정 (임베딩/답변 생성이 같은 풀을 공유)
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() in ("1", "true", "yes")
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
+_http_client: httpx.AsyncClient | None = None
+_openai_client: AsyncOpenAI | None = None
+_chroma_client = None
+_chroma_lock = threading.Lock()
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """keep-alive 연결을 재사용하는 HTTP 클라이언트를 만듭니다. h2 패키지가 없으면 HTTP/1.1을 사용합니다."""
+    limits = httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECONDS
+    )
+    if OPENAI_HTTP2:
+        try:
+            return httpx.AsyncClient(http2=True, limits=limits)
+        except ImportError:
+            logger.warning("HTTP/2를 사용하려면 'httpx[http2]' 패키지가 필요합니다. HTTP/1.1로 연결합니다.")
+    return httpx.AsyncClient(limits=limits)
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    OpenAI 비동기 클라이언트를 처음 사용할 때 생성합니다 (로컬 임베딩만 쓰면 API 키가 없어도 됨).
+    임베딩과 답변 생성이 같은 연결 풀을 공유하며, 호출별 옵션은 with_options로 바꿔서 사용합니다.
+    """
+    global _http_client, _openai_client
+    if _openai_client is None:
+        _http_client = _create_http_client()
+        _openai_client = AsyncOpenAI(http_client=_http_client)
+        logger.info(f"OpenAI 클라이언트 생성 (HTTP/2: {'사용' if OPENAI_HTTP2 else '사용 안 함'}, 최대 연결 {OPENAI_MAX_CONNECTIONS}개).")
+    return _openai_client
+
+def get_chroma_client():
+    """
+    ChromaDB 클라이언트를 처음 사용할 때 엽니다. (chromadb 임포트와 DB 열기 모두 첫 사용 시점으로 미룸)
+    여러 스레드에서 동시에 처음 호출해도 한 번만 엽니다.
+    """
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                import chromadb
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+                logger.info(f"ChromaDB {CHROMA_DB_PATH} 열기 완료.")
+    return _chroma_client
+
+async def close():
+    """열린 클라이언트를 닫습니다. 다음 사용 시 다시 만들어집니다."""
+    global _http_client, _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
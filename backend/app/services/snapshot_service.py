@@ -0,0 +1,387 @@
+# backend/app/services/snapshot_service.py
+
+import os
+import json
+import shutil
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services import chunk_registry
+from app.services.metrics import track_stage
+from app.services.query_cache import invalidate_repo
+from app.services.vector_db_service import get_collection, get_collection_metadata, get_repo_collection_name
+
+logger = logging.getLogger(__name__)
+
+# 레포지토리 인덱스 스냅샷(번들)을 내보내고 불러오는 경로.
+# 번들은 디렉토리 하나로 완결되며, 다른 서버로 복사한 뒤 불러오면 클론/임베딩 없이 바로 검색할 수 있습니다.
+#   manifest.json       커밋 SHA, 임베딩 백엔드/모델/차원, 청크 수, 파일 체크섬
+#   embeddings.npy      청크 임베딩 행렬 (float32, N x 차원, 메모리 매핑으로 읽음)
+#   norms.npy           행별 제곱 노름 (L2 거리 계산용)
+#   chunks.jsonl        행 순서대로 청크 ID/내용/메타데이터
+#   chunk_offsets.npy   chunks.jsonl에서 각 행이 시작하는 바이트 위치
+SNAPSHOTS_DIR = Path(os.getenv("SNAPSHOTS_DIR", "./data/snapshots"))
+# 서버 시작 시 SNAPSHOTS_DIR의 번들을 모두 불러와 읽기 전용으로 검색할지 여부
+# (직접 인덱싱하지 않고 스냅샷만 받아 검색하는 읽기 전용 서버에서 켜기)
+SNAPSHOT_AUTOLOAD = os.getenv("SNAPSHOT_AUTOLOAD", "false").lower() in ("1", "true", "yes")
+# 검색 시 한 번에 계산할 행 수 (행렬 전체를 메모리에 올리지 않고 이 크기씩 나눠 읽음)
+SNAPSHOT_SEARCH_BLOCK_ROWS = int(os.getenv("SNAPSHOT_SEARCH_BLOCK_ROWS", "65536"))
+# 내보낼 때 벡터 DB에서 한 번에 읽을 청크 수
+SNAPSHOT_EXPORT_PAGE_SIZE = int(os.getenv("SNAPSHOT_EXPORT_PAGE_SIZE", "5000"))
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+NORMS_FILE = "norms.npy"
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunk_offsets.npy"
+_DATA_FILES = (EMBEDDINGS_FILE, NORMS_FILE, CHUNKS_FILE, OFFSETS_FILE)
+
+# 불러온 스냅샷 {레포지토리 이름: IndexSnapshot}
+_snapshots: Dict[str, "IndexSnapshot"] = {}
+_snapshots_lock = threading.Lock()
+
+
+class SnapshotError(Exception):
+    """스냅샷을 만들거나 불러올 수 없을 때 발생하는 예외"""
+
+
+class SnapshotPathError(SnapshotError):
+    """번들 경로가 SNAPSHOTS_DIR 밖이거나 번들이 아닌 기존 디렉토리를 가리킬 때 발생하는 예외"""
+
+
+def snapshot_path(repo_name: str) -> Path:
+    """레포지토리 스냅샷 번들의 기본 경로를 반환합니다."""
+    return SNAPSHOTS_DIR / get_repo_collection_name(repo_name)
+
+def resolve_bundle_path(path: str | Path) -> Path:
+    """
+    요청으로 받은 번들 경로를 SNAPSHOTS_DIR 기준으로 해석합니다. (상대 경로는 SNAPSHOTS_DIR 기준)
+    심볼릭 링크/..를 풀어낸 경로가 SNAPSHOTS_DIR 아래가 아니면 SnapshotPathError를 발생시킵니다.
+    """
+    root = SNAPSHOTS_DIR.resolve()
+    resolved = (root / path).resolve()
+    if resolved == root or not resolved.is_relative_to(root):
+        raise SnapshotPathError(f"스냅샷 번들 경로는 {SNAPSHOTS_DIR} 아래여야 합니다: {path}")
+    return resolved
+
+def _file_sha256(path: Path) -> str:
+    """파일의 SHA-256 해시를 계산합니다."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _replace_dir(tmp_dir: Path, target: Path):
+    """
+    임시 디렉토리를 target으로 교체합니다. (기존 번들은 새 번들이 자리 잡은 뒤 삭제)
+    target이 이미 있는데 스냅샷 번들(manifest.json이 있는 디렉토리)이 아니면 건드리지 않고 SnapshotPathError를 발생시킵니다.
+    """
+    if target.exists() and not (target / MANIFEST_FILE).is_file():
+        raise SnapshotPathError(f"스냅샷 번들이 아닌 기존 경로는 덮어쓸 수 없습니다: {target}")
+    old_dir = target.with_name(target.name + ".old")
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    if target.exists():
+        target.rename(old_dir)
+    tmp_dir.rename(target)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+
+
+class IndexSnapshot:
+    """
+    읽기 전용으로 불러온 스냅샷 번들.
+    임베딩 행렬은 메모리 매핑으로 열어 두고, 검색 시 블록 단위로 읽으므로 메모리 사용량이 번들 크기와 무관합니다.
+    거리는 ChromaDB 기본 거리(제곱 L2)와 같은 방식으로 계산하므로 컬렉션 검색 결과와 그대로 합칠 수 있습니다.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            with open(path / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"스냅샷 매니페스트 {path / MANIFEST_FILE}를 읽을 수 없습니다: {e}")
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"지원하지 않는 스냅샷 형식입니다: {self.manifest.get('format_version')}")
+        try:
+            self.embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode='r')
+            self.norms = np.load(path / NORMS_FILE, mmap_mode='r')
+            self.offsets = np.load(path / OFFSETS_FILE, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"스냅샷 {path}의 데이터 파일을 열 수 없습니다: {e}")
+        count = self.manifest["count"]
+        if (self.embeddings.shape != (count, self.manifest["embedding_dimension"]) or self.embeddings.dtype != np.float32
+                or self.norms.shape != (count,) or self.offsets.shape != (count,)):
+            raise SnapshotError(f"스냅샷 {path}의 데이터 크기가 매니페스트와 다릅니다.")
+
+    @property
+    def repo_name(self) -> str:
+        return self.manifest["repo_name"]
+
+    def verify(self):
+        """데이터 파일 체크섬이 매니페스트와 일치하는지 확인합니다."""
+        for name, info in self.manifest["files"].items():
+            if _file_sha256(self.path / name) != info["sha256"]:
+                raise SnapshotError(f"스냅샷 {self.path}의 {name} 체크섬이 일치하지 않습니다.")
+
+    def _read_chunks(self, rows: List[int]) -> Dict[int, Dict[str, Any]]:
+        """행 번호에 해당하는 청크를 chunks.jsonl에서 읽습니다. (필요한 줄만 찾아 읽음)"""
+        chunks = {}
+        with open(self.path / CHUNKS_FILE, 'rb') as f:
+            for row in sorted(rows):
+                f.seek(int(self.offsets[row]))
+                chunks[row] = json.loads(f.readline())
+        return chunks
+
+    def search(self, query_embeddings: List[List[float]], n_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        여러 쿼리 임베딩과 가까운 청크를 찾아 쿼리별 [{"id", "content", "metadata", "distance"}] 리스트로 반환합니다.
+        행렬을 SNAPSHOT_SEARCH_BLOCK_ROWS행씩 읽어 모든 쿼리와의 거리를 한 번의 행렬 곱으로 계산하고,
+        블록마다 상위 n_results개만 남겨 다음 블록 결과와 합칩니다.
+        """
+        count = len(self.norms)
+        k = min(n_results, count)
+        if not query_embeddings or k <= 0:
+            return [[] for _ in query_embeddings]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.embeddings.shape[1]:
+            raise SnapshotError(
+                f"쿼리 임베딩 차원({queries.shape[-1]})이 스냅샷 임베딩 차원({self.embeddings.shape[1]})과 다릅니다."
+            )
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_distances = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, count, SNAPSHOT_SEARCH_BLOCK_ROWS):
+            end = min(start + SNAPSHOT_SEARCH_BLOCK_ROWS, count)
+            # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q·x
+            distances = queries @ self.embeddings[start:end].T
+            distances *= -2
+            distances += self.norms[start:end]
+            distances += query_norms[:, None]
+            rows = np.broadcast_to(np.arange(start, end, dtype=np.int64), distances.shape)
+            distances = np.concatenate([best_distances, distances], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if distances.shape[1] > k:
+                top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                distances = np.take_along_axis(distances, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_distances, best_rows = distances, rows
+
+        order = np.argsort(best_distances, axis=1, kind='stable')
+        best_distances = np.maximum(np.take_along_axis(best_distances, order, axis=1), 0.0)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        chunks = self._read_chunks(np.unique(best_rows).tolist())
+        return [
+            [
+                {
+                    "id": chunks[row]["id"],
+                    "content": chunks[row]["content"],
+                    "metadata": chunks[row]["metadata"],
+                    "distance": float(distance)
+                }
+                for row, distance in zip(query_rows.tolist(), query_distances.tolist())
+            ]
+            for query_rows, query_distances in zip(best_rows, best_distances)
+        ]
+
+
+def _write_snapshot(collection, repo_name: str, manifest: dict, target: Path) -> dict:
+    """
+    컬렉션의 임베딩/문서와 청크 메타데이터를 번들 디렉토리로 씁니다.
+    임시 디렉토리에 모두 쓴 뒤 교체하므로 중간에 실패해도 기존 번들은 그대로 남습니다.
+    """
+    count = collection.count()
+    if count == 0:
+        raise SnapshotError(f"레포지토리 {repo_name}의 인덱스가 비어 있습니다.")
+    if target.exists() and not (target / MANIFEST_FILE).is_file():
+        raise SnapshotPathError(f"스냅샷 번들이 아닌 기존 경로는 덮어쓸 수 없습니다: {target}")
+    tmp_dir = target.with_name(target.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    try:
+        embeddings = None
+        norms = np.empty(count, dtype=np.float32)
+        offsets = np.empty(count, dtype=np.int64)
+        row = 0
+        with open(tmp_dir / CHUNKS_FILE, 'wb') as chunks_file:
+            while row < count:
+                page = collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=SNAPSHOT_EXPORT_PAGE_SIZE,
+                    offset=row
+                )
+                if not page['ids']:
+                    break
+                if row + len(page['ids']) > count:
+                    raise SnapshotError(f"내보내는 중에 레포지토리 {repo_name}의 인덱스가 바뀌었습니다.")
+                matrix = np.asarray(page['embeddings'], dtype=np.float32)
+                if embeddings is None:
+                    # 행렬은 처음부터 .npy 파일에 메모리 매핑으로 써서 전체를 메모리에 올리지 않음
+                    embeddings = np.lib.format.open_memmap(
+                        tmp_dir / EMBEDDINGS_FILE, mode='w+', dtype=np.float32, shape=(count, matrix.shape[1])
+                    )
+                embeddings[row:row + len(matrix)] = matrix
+                norms[row:row + len(matrix)] = np.einsum('ij,ij->i', matrix, matrix)
+
+                # 메타데이터는 청크 메타데이터 저장소에서 가져오고, 없으면(이전 방식 청크) 벡터 DB 값을 사용
+                metadatas = chunk_registry.get_metadatas(page['ids'])
+                for i, (chunk_id, document) in enumerate(zip(page['ids'], page['documents'])):
+                    offsets[row + i] = chunks_file.tell()
+                    metadata = metadatas.get(chunk_id) or (page['metadatas'][i] if page['metadatas'] else None) or {}
+                    line = json.dumps({"id": chunk_id, "content": document, "metadata": metadata}, ensure_ascii=False)
+                    chunks_file.write(line.encode('utf-8') + b"\n")
+                row += len(page['ids'])
+        if row != count:
+            raise SnapshotError(f"내보내는 중에 레포지토리 {repo_name}의 인덱스가 바뀌었습니다.")
+        embeddings.flush()
+        del embeddings
+        np.save(tmp_dir / NORMS_FILE, norms)
+        np.save(tmp_dir / OFFSETS_FILE, offsets)
+
+        manifest = {
+            **manifest,
+            "count": count,
+            "embedding_dimension": int(np.load(tmp_dir / EMBEDDINGS_FILE, mmap_mode='r').shape[1]),
+            "files": {
+                name: {"sha256": _file_sha256(tmp_dir / name), "bytes": (tmp_dir / name).stat().st_size}
+                for name in _DATA_FILES
+            }
+        }
+        with open(tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        _replace_dir(tmp_dir, target)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return manifest
+
+async def export_snapshot(repo_name: str, index_state: dict | None, output_dir: Path = None) -> dict:
+    """
+    레포지토리 인덱스를 스냅샷 번들로 내보내고 매니페스트를 반환합니다.
+    output_dir는 SNAPSHOTS_DIR 아래 경로여야 하며, 없으면 레포지토리별 기본 경로에 씁니다.
+    인덱싱과 동시에 실행되지 않도록 indexing_service.export_repository_snapshot을 통해 호출합니다.
+    """
+    target = resolve_bundle_path(output_dir) if output_dir else snapshot_path(repo_name)
+    collection_name = get_repo_collection_name(repo_name)
+    collection = await get_collection(collection_name)
+    if collection is None:
+        raise SnapshotError(f"인덱싱된 레포지토리를 찾을 수 없습니다: {repo_name}")
+    collection_metadata = await get_collection_metadata(collection_name) or {}
+    index_state = index_state or {}
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "repo_name": repo_name,
+        "repo_url": index_state.get("repo_url"),
+        "branch": index_state.get("branch"),
+        "commit": index_state.get("last_commit"),
+        "indexed_at": index_state.get("indexed_at"),
+        "embedding_backend": collection_metadata.get("embedding_backend"),
+        "embedding_model": collection_metadata.get("embedding_model"),
+        "distance": "l2",
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    manifest = await asyncio.to_thread(_write_snapshot, collection, repo_name, manifest, target)
+    logger.info(f"레포지토리 {repo_name} 스냅샷 내보내기 완료: {target} (청크 {manifest['count']}개, 커밋 {manifest['commit']})")
+    return {**manifest, "path": str(target)}
+
+def load_snapshot(path: Path, verify: bool = False) -> IndexSnapshot:
+    """번들을 열어 해당 레포지토리를 읽기 전용 스냅샷으로 검색하도록 등록합니다. (같은 레포의 이전 스냅샷은 교체)"""
+    snapshot = IndexSnapshot(path)
+    if verify:
+        snapshot.verify()
+    with _snapshots_lock:
+        _snapshots[snapshot.repo_name] = snapshot
+    invalidate_repo(snapshot.repo_name)
+    logger.info(f"레포지토리 {snapshot.repo_name} 스냅샷 불러오기 완료: {path} (청크 {snapshot.manifest['count']}개)")
+    return snapshot
+
+def _import_snapshot(source: Path, verify: bool) -> dict:
+    """import_snapshot의 실제 구현 (스레드에서 실행)"""
+    snapshot = IndexSnapshot(source)
+    if verify:
+        snapshot.verify()
+    target = snapshot_path(snapshot.repo_name)
+    if source.resolve() != target.resolve():
+        # 불러온 번들은 SNAPSHOTS_DIR로 복사하여 서버를 다시 시작해도 자동으로 불러오도록 함
+        tmp_dir = target.with_name(target.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        shutil.copytree(source, tmp_dir)
+        with _snapshots_lock:
+            previous = _snapshots.pop(snapshot.repo_name, None)
+        del previous
+        _replace_dir(tmp_dir, target)
+    return load_snapshot(target).manifest
+
+async def import_snapshot(source: Path, verify: bool = True) -> dict:
+    """
+    SNAPSHOTS_DIR 아래에 복사해 둔 스냅샷 번들을 레포지토리별 기본 경로로 옮겨 읽기 전용으로 검색하도록 등록하고
+    매니페스트를 반환합니다. verify=True이면 데이터 파일 체크섬을 확인합니다.
+    """
+    source = resolve_bundle_path(source)
+    if not (source / MANIFEST_FILE).is_file():
+        raise SnapshotError(f"스냅샷 번들을 찾을 수 없습니다: {source}")
+    return await asyncio.to_thread(_import_snapshot, source, verify)
+
+def unload_snapshot(repo_name: str, delete: bool = False) -> bool:
+    """
+    읽기 전용 스냅샷 검색을 중단합니다. delete=True이면 SNAPSHOTS_DIR의 번들도 삭제합니다.
+    불러온 스냅샷이나 삭제한 번들이 있었으면 True를 반환합니다.
+    """
+    with _snapshots_lock:
+        snapshot = _snapshots.pop(repo_name, None)
+    invalidate_repo(repo_name)
+    unloaded = snapshot is not None
+    del snapshot
+    target = snapshot_path(repo_name)
+    if delete and (target / MANIFEST_FILE).is_file():
+        shutil.rmtree(target)
+        return True
+    return unloaded
+
+def get_snapshot(repo_name: str) -> IndexSnapshot | None:
+    """레포지토리를 읽기 전용 스냅샷으로 검색 중이면 해당 스냅샷을 반환합니다."""
+    return _snapshots.get(repo_name)
+
+def list_snapshots() -> Dict[str, dict]:
+    """불러온 스냅샷 목록을 {레포지토리 이름: 매니페스트} 형태로 반환합니다."""
+    with _snapshots_lock:
+        return {repo_name: {**snapshot.manifest, "path": str(snapshot.path)} for repo_name, snapshot in _snapshots.items()}
+
+def load_all_snapshots():
+    """SNAPSHOTS_DIR의 모든 번들을 불러옵니다. (읽을 수 없는 번들은 건너뜀)"""
+    if not SNAPSHOT_AUTOLOAD or not SNAPSHOTS_DIR.is_dir():
+        return
+    for path in sorted(SNAPSHOTS_DIR.iterdir()):
+        if not (path / MANIFEST_FILE).is_file() or path.name.endswith((".tmp", ".old")):
+            continue
+        try:
+            load_snapshot(path)
+        except SnapshotError as e:
+            logger.warning(f"스냅샷 {path} 불러오기 실패: {e}")
+
+async def query_snapshot_batch(
+    repo_name: str,
+    query_embeddings: List[List[float]],
+    n_results: int = 5
+) -> List[List[Dict[str, Any]]]:
+    """읽기 전용 스냅샷에서 여러 쿼리를 검색하고 쿼리별 결과 리스트를 입력 순서대로 반환합니다."""
+    snapshot = get_snapshot(repo_name)
+    if snapshot is None:
+        return [[] for _ in query_embeddings]
+    with track_stage("vector_query"):
+        results = await asyncio.to_thread(snapshot.search, query_embeddings, n_results)
+    logger.info(f"레포지토리 {repo_name} 스냅샷에서 쿼리 {len(query_embeddings)}개 실행 완료.")
+    return results
@@ -0,0 +1,47 @@
+# backend/app/services/token_counter.py
+
+import logging
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError: # tiktoken이 없으면 글자 수 기반 추정 사용
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# OpenAI 임베딩/채팅 모델이 사용하는 토크나이저
+TOKENIZER_ENCODING = "cl100k_base"
+# 토크나이저를 쓸 수 없을 때 사용하는 토큰당 평균 글자 수 (코드는 영어 문장보다 토큰이 조밀함)
+CHARS_PER_TOKEN_ESTIMATE = 3
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """tiktoken 인코딩을 한 번만 불러옵니다. 불러올 수 없으면 None을 반환합니다."""
+    if tiktoken is None:
+        logger.warning("tiktoken이 설치되어 있지 않아 토큰 수를 글자 수로 추정합니다.")
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        # 오프라인 환경에서는 인코딩 파일을 내려받지 못할 수 있음
+        logger.warning(f"tiktoken 인코딩 '{TOKENIZER_ENCODING}' 로드 실패, 글자 수로 추정합니다: {e}")
+        return None
+
+def count_tokens(text: str) -> int:
+    """텍스트의 토큰 수를 계산합니다."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """텍스트를 최대 토큰 수 이하로 자릅니다."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN_ESTIMATE]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -1,93 +1,258 @@
 # backend/app/services/vector_db_service.py
 
+import re
+import asyncio
+import hashlib
 import logging
 from typing import List, Dict, Any
-import chromadb
-from chromadb.utils import embedding_functions
+from app.services import chunk_registry
+from app.services.service_container import get_chroma_client
+from app.services.metrics import track_stage
 
 logger = logging.getLogger(__name__)
 
-# ChromaDB 클라이언트 초기화
-# 이 예시에서는 로컬 파일 시스템에 데이터를 저장합니다.
-# docker-compose.yml의 volumes 설정과 일치해야 합니다.
-CHROMA_DB_PATH = "./chroma_db"
-client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+# ChromaDB 클라이언트는 처음 사용할 때 service_container에서 엽니다 (서버 시작 시간이 DB 크기와 무관하도록).
+# 우리는 외부 서비스(OpenAI 또는 로컬 백엔드)에서 임베딩을 가져오므로 ChromaDB 자체 임베딩 함수는 사용하지 않습니다.
 
-# 기본 임베딩 함수 설정 (ChromaDB가 자체적으로 임베딩을 생성할 때 사용)
-# 우리는 외부 서비스(OpenAI/Anthropic)에서 임베딩을 가져올 것이므로 이 함수는 사용하지 않습니다.
-# 하지만 클라이언트를 초기화하기 위해 필요할 수 있습니다.
-# ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+# 레포지토리별 컬렉션 이름 접두사
+REPO_COLLECTION_PREFIX = "repo_"
 
+# 열린 컬렉션 핸들 캐시 (매 요청마다 get_or_create_collection을 호출하지 않도록)
+_collections: Dict[str, Any] = {}
 
-async def get_or_create_collection(collection_name: str):
+
+def get_repo_collection_name(repo_name: str) -> str:
+    """
+    레포지토리 이름으로 ChromaDB 컬렉션 이름을 만듭니다.
+    ChromaDB 이름 규칙([a-zA-Z0-9._-], 영숫자로 시작/끝)에 맞게 바꾸고,
+    바꾼 이름끼리 겹치지 않도록 원래 이름의 해시를 붙입니다.
+    """
+    safe_name = re.sub(r'[^a-zA-Z0-9._-]+', '-', repo_name).strip('._-')[:40]
+    name_hash = hashlib.sha1(repo_name.encode("utf-8")).hexdigest()[:8]
+    return f"{REPO_COLLECTION_PREFIX}{safe_name}_{name_hash}" if safe_name else f"{REPO_COLLECTION_PREFIX}{name_hash}"
+
+async def get_or_create_collection(collection_name: str, metadata: Dict[str, Any] = None):
     """
     주어진 이름의 ChromaDB 컬렉션을 가져오거나 새로 생성합니다.
+    한 번 연 컬렉션 핸들은 캐시하여 재사용합니다.
     """
+    collection = _collections.get(collection_name)
+    if collection is not None:
+        return collection
     try:
         # 컬렉션이 없으면 새로 생성 (create_if_not_exists=True)
-        collection = client.get_or_create_collection(name=collection_name)
+        # 처음 호출이면 ChromaDB를 여는 것도 포함되므로 스레드에서 실행
+        collection = await asyncio.to_thread(
+            lambda: get_chroma_client().get_or_create_collection(name=collection_name, metadata=metadata)
+        )
+        _collections[collection_name] = collection
         logger.info(f"ChromaDB 컬렉션 '{collection_name}' 가져오기/생성 완료.")
         return collection
     except Exception as e:
         logger.error(f"ChromaDB 컬렉션 생성/가져오기 중 오류 발생: {e}")
         raise
 
+def _list_collections() -> Dict[str, Dict[str, Any]]:
+    """ChromaDB의 모든 컬렉션 {이름: 메타데이터}를 반환합니다. (버전에 따라 이름만 반환하는 경우도 처리)"""
+    collections = {}
+    for collection in get_chroma_client().list_collections():
+        if isinstance(collection, str):
+            collections[collection] = {}
+        else:
+            collections[collection.name] = collection.metadata or {}
+    return collections
+
+async def get_collection(collection_name: str):
+    """
+    컬렉션을 새로 만들지 않고 가져옵니다. 없으면 None을 반환합니다.
+    """
+    collection = _collections.get(collection_name)
+    if collection is not None:
+        return collection
+    if collection_name not in await asyncio.to_thread(_list_collections):
+        return None
+    return await get_or_create_collection(collection_name)
+
+async def get_collection_metadata(collection_name: str) -> Dict[str, Any] | None:
+    """
+    컬렉션 메타데이터(레포 이름, 임베딩 모델/차원 등)를 반환합니다. 컬렉션이 없으면 None을 반환합니다.
+    캐시된 핸들의 메타데이터를 사용하므로 전체 컬렉션 목록은 핸들을 처음 열 때만 조회합니다.
+    """
+    collection = await get_collection(collection_name)
+    if collection is None:
+        return None
+    return collection.metadata or {}
+
+async def list_repo_collection_metadata() -> Dict[str, Dict[str, Any]]:
+    """
+    레포지토리별 컬렉션 목록을 {컬렉션 이름: 메타데이터} 형태로 반환합니다.
+    """
+    collections = await asyncio.to_thread(_list_collections)
+    return {name: metadata for name, metadata in collections.items() if name.startswith(REPO_COLLECTION_PREFIX)}
+
+async def drop_collection(collection_name: str) -> bool:
+    """
+    컬렉션을 통째로 삭제합니다. (문서를 하나씩 지우는 것보다 훨씬 빠름)
+    컬렉션이 없었으면 False를 반환합니다.
+    """
+    _collections.pop(collection_name, None)
+    if collection_name not in await asyncio.to_thread(_list_collections):
+        return False
+    try:
+        await asyncio.to_thread(get_chroma_client().delete_collection, name=collection_name)
+        logger.info(f"ChromaDB 컬렉션 '{collection_name}' 삭제 완료.")
+        return True
+    except Exception as e:
+        logger.error(f"ChromaDB 컬렉션 삭제 중 오류 발생: {e}")
+        raise
+
 async def add_documents_to_collection(
     collection_name: str,
     documents: List[str], # 청크 텍스트 리스트
-    metadatas: List[Dict[str, Any]], # 청크 메타데이터 리스트
+    metadatas: List[Dict[str, Any]] | None, # 청크 메타데이터 리스트 (청크 메타데이터 저장소를 쓰면 None)
     embeddings: List[List[float]], # 생성된 임베딩 벡터 리스트
-    ids: List[str] # 각 문서의 고유 ID 리스트
+    ids: List[str], # 각 문서의 고유 ID 리스트
+    collection_metadata: Dict[str, Any] = None # 컬렉션을 새로 만들 때 붙일 메타데이터
 ):
     """
-    ChromaDB 컬렉션에 문서, 메타데이터, 임베딩을 추가합니다.
+    ChromaDB 컬렉션에 문서, 메타데이터, 임베딩을 저장합니다.
+    이미 있는 ID는 덮어쓰므로(upsert) 같은 청크를 다시 저장해도 중복되지 않습니다.
     """
     try:
-        collection = await get_or_create_collection(collection_name)
-        # add 메서드는 list 형태로 받습니다.
-        collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            embeddings=embeddings,
-            ids=ids
-        )
-        logger.info(f"컬렉션 '{collection_name}'에 {len(documents)}개 문서 추가 완료.")
+        collection = await get_or_create_collection(collection_name, collection_metadata)
+        # upsert 메서드는 list 형태로 받습니다.
+        # 저장은 블로킹 I/O이므로 스레드에서 실행하여 이벤트 루프를 막지 않음
+        with track_stage("vector_write"):
+            await asyncio.to_thread(
+                collection.upsert,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings,
+                ids=ids
+            )
+        logger.info(f"컬렉션 '{collection_name}'에 {len(documents)}개 문서 저장 완료.")
     except Exception as e:
         logger.error(f"ChromaDB에 문서 추가 중 오류 발생: {e}")
         raise
 
-async def query_collection(
+def _split_query_results(results: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """ChromaDB 쿼리 결과를 쿼리별 [{"id", "content", "metadata", "distance"}] 리스트로 바꿉니다."""
+    if not results['documents']:
+        return []
+    return [
+        [
+            {
+                "id": results['ids'][q][i],
+                "content": results['documents'][q][i],
+                "metadata": results['metadatas'][q][i],
+                "distance": results['distances'][q][i]
+            }
+            for i in range(len(results['documents'][q]))
+        ]
+        for q in range(len(results['documents']))
+    ]
+
+def _hydrate_query_results(per_query_results: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+    """벡터 DB에는 청크 ID만 있으므로 메타데이터는 청크 메타데이터 저장소에서 한 번에 채움"""
+    chunk_registry.hydrate_results([result for results in per_query_results for result in results])
+    return per_query_results
+
+async def query_collection_batch(
     collection_name: str,
-    query_texts: List[str] = None, # 쿼리할 텍스트 (직접 임베딩 생성)
-    query_embeddings: List[List[float]] = None, # 쿼리 임베딩 (미리 생성된 경우)
+    query_embeddings: List[List[float]],
     n_results: int = 5,
-    where: Dict[str, Any] = None, # 메타데이터 필터링 조건
-    where_document: Dict[str, Any] = None # 문서 내용 필터링 조건
-) -> List[Dict[str, Any]]:
+    where: Dict[str, Any] = None
+) -> List[List[Dict[str, Any]]]:
     """
-    ChromaDB 컬렉션에서 쿼리를 실행하고 결과를 반환합니다.
+    여러 쿼리 임베딩을 한 번의 ChromaDB 쿼리로 실행하고, 쿼리별 결과 리스트를 입력 순서대로 반환합니다.
     """
+    if not query_embeddings:
+        return []
     try:
-        collection = await get_or_create_collection(collection_name)
-        results = collection.query(
-            query_texts=query_texts,
-            query_embeddings=query_embeddings,
-            n_results=n_results,
-            where=where,
-            where_document=where_document
-            # include=['documents', 'metadatas', 'distances'] # 어떤 정보를 반환할지
-        )
-        logger.info(f"컬렉션 '{collection_name}'에서 쿼리 실행 완료. {len(results['documents'][0]) if results['documents'] else 0}개 결과.")
-        # ChromaDB 결과 형식을 필요한 부분만 추출하여 반환
-        processed_results = []
-        if results['documents']:
-            for i in range(len(results['documents'][0])):
-                processed_results.append({
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "distance": results['distances'][0][i]
-                })
-        return processed_results
+        collection = await get_collection(collection_name)
+        if collection is None:
+            logger.warning(f"컬렉션 '{collection_name}'이 없어 빈 결과를 반환합니다.")
+            return [[] for _ in query_embeddings]
+        with track_stage("vector_query"):
+            results = await asyncio.to_thread(
+                collection.query,
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where
+            )
+        per_query_results = await asyncio.to_thread(_hydrate_query_results, _split_query_results(results))
+        logger.info(f"컬렉션 '{collection_name}'에서 쿼리 {len(query_embeddings)}개 실행 완료.")
+        return per_query_results or [[] for _ in query_embeddings]
     except Exception as e:
         logger.error(f"ChromaDB 쿼리 중 오류 발생: {e}")
-        raise
\ No newline at end of file
+        raise
+
+async def query_collections_batch(
+    collection_names: List[str],
+    query_embeddings: List[List[float]],
+    n_results: int = 5,
+    where: Dict[str, Any] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    여러 컬렉션에 여러 쿼리를 동시에 실행하고 (컬렉션마다 한 번의 쿼리),
+    쿼리별로 거리 기준으로 합친 상위 n_results개 결과를 입력 순서대로 반환합니다.
+    """
+    results = await asyncio.gather(*(
+        query_collection_batch(name, query_embeddings, n_results=n_results, where=where)
+        for name in collection_names
+    ))
+    merged_results = []
+    for q in range(len(query_embeddings)):
+        merged = [result for collection_results in results for result in collection_results[q]]
+        merged.sort(key=lambda result: result["distance"])
+        merged_results.append(merged[:n_results])
+    return merged_results
+
+async def delete_documents_from_collection(
+    collection_name: str,
+    where: Dict[str, Any] = None, # 삭제할 문서의 메타데이터 필터링 조건
+    ids: List[str] = None # 삭제할 문서 ID 리스트
+):
+    """
+    ChromaDB 컬렉션에서 ID 또는 조건에 맞는 문서를 삭제합니다.
+    """
+    try:
+        collection = await get_collection(collection_name)
+        if collection is None:
+            return
+        await asyncio.to_thread(collection.delete, ids=ids, where=where)
+        if ids is not None:
+            logger.info(f"컬렉션 '{collection_name}'에서 문서 {len(ids)}개 삭제 완료.")
+        else:
+            logger.info(f"컬렉션 '{collection_name}'에서 조건 {where}에 맞는 문서 삭제 완료.")
+    except Exception as e:
+        logger.error(f"ChromaDB 문서 삭제 중 오류 발생: {e}")
+        raise
+
+async def get_document_ids(collection_name: str, page_size: int = 10000) -> List[str]:
+    """
+    컬렉션의 모든 문서 ID를 반환합니다. (내용/임베딩은 읽지 않음)
+    """
+    collection = await get_collection(collection_name)
+    if collection is None:
+        return []
+    ids = []
+    while True:
+        page = await asyncio.to_thread(collection.get, include=[], limit=page_size, offset=len(ids))
+        ids.extend(page['ids'])
+        if len(page['ids']) < page_size:
+            return ids
+
+async def has_documents(collection_name: str, where: Dict[str, Any] = None) -> bool:
+    """
+    ChromaDB 컬렉션에 조건에 맞는 문서가 하나라도 있는지 확인합니다.
+    """
+    try:
+        collection = await get_collection(collection_name)
+        if collection is None:
+            return False
+        results = await asyncio.to_thread(collection.get, where=where, limit=1, include=[])
+        return len(results['ids']) > 0
+    except Exception as e:
+        logger.error(f"ChromaDB 문서 조회 중 오류 발생: {e}")
+        raise
@@ -0,0 +1,71 @@
+# backend/benchmarks/compare.py
+"""
+두 벤치마크 결과(JSON)를 비교하여 처리량 감소/지연 시간 증가를 보여줍니다.
+허용 비율(--threshold)을 넘는 성능 저하가 있으면 종료 코드 1을 반환하므로 배포 전 점검에 사용할 수 있습니다.
+
+사용법 (backend 디렉토리에서):
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+def _collect_metrics(results: dict) -> dict[str, tuple[float, bool]]:
+    """
+    비교할 지표를 {이름: (값, 클수록 좋은지)} 형태로 모읍니다.
+    처리량(*_per_s)은 클수록, 지연 시간(p50/p95)은 작을수록 좋습니다.
+    """
+    metrics = {}
+    for stage, values in results.get("stages", {}).items():
+        for key, value in values.items():
+            if key.endswith("_per_s") and value is not None:
+                metrics[f"{stage}.{key}"] = (value, True)
+    for mode, kinds in results.get("query", {}).items():
+        for kind, values in kinds.items():
+            for key in ("p50_ms", "p95_ms"):
+                if key in values:
+                    metrics[f"query.{mode}.{kind}.{key}"] = (values[key], False)
+    return metrics
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> tuple[list[list[str]], list[str]]:
+    base_metrics = _collect_metrics(baseline)
+    new_metrics = _collect_metrics(candidate)
+    rows, regressions = [], []
+    for name, (base_value, higher_is_better) in base_metrics.items():
+        if name not in new_metrics or not base_value:
+            continue
+        new_value = new_metrics[name][0]
+        change = (new_value - base_value) / base_value
+        regressed = (-change if higher_is_better else change) > threshold
+        if regressed:
+            regressions.append(name)
+        rows.append([name, f"{base_value:g}", f"{new_value:g}", f"{change:+.1%}", "저하" if regressed else ""])
+    return rows, regressions
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="RepoMind 벤치마크 결과 비교")
+    parser.add_argument("baseline", type=Path, help="기준 결과 JSON")
+    parser.add_argument("candidate", type=Path, help="비교할 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="성능 저하로 볼 변화 비율 (기본 10%%)")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    candidate = json.loads(args.candidate.read_text(encoding="utf-8"))
+    rows, regressions = compare(baseline, candidate, args.threshold)
+
+    header = ["지표", "기준", "비교", "변화", ""]
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+    if regressions:
+        print(f"\n{args.threshold:.0%} 넘게 성능이 저하된 지표 {len(regressions)}개: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n성능 저하 없음.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# backend/benchmarks/fakes.py
+"""
+벤치마크용 OpenAI 대체 구현.
+실제 API 대신 설정한 지연 시간만큼 기다린 뒤 결정적인 결과를 반환하여,
+네트워크/요금 없이 파이프라인 자체의 성능을 측정할 수 있도록 합니다.
+"""
+
+import asyncio
+
+from app.services.embedding_backends import HashingEmbeddingBackend
+
+
+class FakeOpenAI:
+    """
+    get_embeddings / generate_response_from_context를 대체하는 가짜 구현.
+    임베딩은 해싱 벡터(결정적)를 사용하므로 검색 결과도 실행마다 같습니다.
+    """
+
+    def __init__(
+        self,
+        embed_latency_ms: float = 50.0,
+        embed_per_text_ms: float = 0.05,
+        llm_latency_ms: float = 300.0,
+        dimension: int = 256
+    ):
+        self.embed_latency = embed_latency_ms / 1000
+        self.embed_per_text = embed_per_text_ms / 1000
+        self.llm_latency = llm_latency_ms / 1000
+        self._backend = HashingEmbeddingBackend(dimension)
+        self.embedding_calls = 0
+        self.embedded_texts = 0
+        self.llm_calls = 0
+
+    async def get_embeddings(self, texts: list[str], stats: dict = None) -> list[list[float]]:
+        self.embedding_calls += 1
+        self.embedded_texts += len(texts)
+        if stats is not None:
+            stats["cache_misses"] = stats.get("cache_misses", 0) + len(texts)
+        # 요청당 고정 지연 + 텍스트 수에 비례한 지연 (실제 API의 왕복/처리 시간 흉내)
+        await asyncio.sleep(self.embed_latency + self.embed_per_text * len(texts))
+        return self._backend.embed(texts)
+
+    async def generate_response_from_context(self, query: str, context_chunks: list, model: str = None) -> str:
+        self.llm_calls += 1
+        await asyncio.sleep(self.llm_latency)
+        return f"'{query}'에 대한 가짜 답변 (컨텍스트 청크 {len(context_chunks)}개)"
@@ -0,0 +1,244 @@
+# backend/benchmarks/run_benchmark.py
+"""
+RepoMind 인덱싱/질의 성능 벤치마크.
+가상 레포지토리를 만들고 OpenAI 호출을 지연 시간이 있는 가짜 구현으로 바꾼 뒤,
+단계별(파일 스캔, 파일 읽기, 청크 분할, 프로세스 풀 읽기+청크 분할, 임베딩, Chroma 저장, 전체 인덱싱, 질의) 처리량과 지연 시간을 JSON으로 기록합니다.
+실제 GitHub/OpenAI에 접속하지 않으며, 데이터는 임시 디렉토리에 만들고 끝나면 지웁니다.
+
+사용법 (backend 디렉토리에서):
+    python -m benchmarks.run_benchmark --files 500 --languages python=0.5,typescript=0.3,markdown=0.2 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """nearest-rank 방식의 백분위수"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+def _latency_summary(seconds: list[float]) -> dict:
+    milliseconds = [value * 1000 for value in seconds]
+    return {
+        "count": len(milliseconds),
+        "p50_ms": round(_percentile(milliseconds, 50), 3),
+        "p95_ms": round(_percentile(milliseconds, 95), 3),
+        "mean_ms": round(statistics.mean(milliseconds), 3),
+        "max_ms": round(max(milliseconds), 3),
+    }
+
+def _throughput(seconds: float, **counts: int) -> dict:
+    result = {"seconds": round(seconds, 4)}
+    for name, count in counts.items():
+        result[name] = count
+        result[f"{name}_per_s"] = round(count / seconds, 2) if seconds > 0 else None
+    return result
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "-C", str(BACKEND_DIR), "rev-parse", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def _build_queries(symbols: list[str], count: int) -> list[str]:
+    """식별자 질문과 자연어 질문을 번갈아 만듭니다."""
+    unique_symbols = list(dict.fromkeys(symbols))
+    queries = []
+    for i in range(count):
+        symbol = unique_symbols[(i * 7919) % len(unique_symbols)]
+        queries.append(symbol if i % 2 == 0 else f"{symbol.replace('_', ' ')} 함수는 어떻게 동작하나요?")
+    return queries
+
+
+async def run_benchmark(args: argparse.Namespace, workdir: Path) -> dict:
+    # 앱 모듈은 ./data, ./chroma_db를 현재 디렉토리 기준으로 사용하므로 임시 디렉토리로 이동한 뒤 임포트
+    os.chdir(workdir)
+    import app.main as main
+    from app.services import indexing_service, ingest_pool, query_cache
+    from app.services.code_parser import chunk_text
+    from app.services.github_service import get_repo_files, read_file_content
+    from app.services.vector_db_service import add_documents_to_collection
+    from benchmarks.fakes import FakeOpenAI
+    from benchmarks.synthetic_repo import generate_repo, parse_language_mix
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    fake = FakeOpenAI(args.embed_latency_ms, args.embed_per_text_ms, args.llm_latency_ms, args.dimension)
+    indexing_service.get_embeddings = fake.get_embeddings
+    main.get_embeddings = fake.get_embeddings
+    main.generate_response_from_context = fake.generate_response_from_context
+    main.OPENAI_API_KEY = main.OPENAI_API_KEY or "benchmark"
+
+    repo_path = workdir / "source_repo"
+    started = time.perf_counter()
+    repo_info = generate_repo(
+        repo_path, args.files, parse_language_mix(args.languages), args.units_per_file, args.lines_per_unit, args.seed
+    )
+    generate_seconds = time.perf_counter() - started
+    repo_name = "benchmark-repo"
+    stages = {}
+
+    # 1. 파일 스캔
+    started = time.perf_counter()
+    file_paths = get_repo_files(repo_path)
+    stages["get_repo_files"] = _throughput(time.perf_counter() - started, files=len(file_paths))
+
+    # 2. 파일 읽기
+    started = time.perf_counter()
+    contents = [(path, read_file_content(path)) for path in file_paths]
+    read_seconds = time.perf_counter() - started
+    total_bytes = sum(len(content.encode("utf-8")) for _, content in contents if content)
+    stages["read_file_content"] = _throughput(read_seconds, files=len(contents), bytes=total_bytes)
+
+    # 3. 청크 분할
+    started = time.perf_counter()
+    chunks = []
+    for path, content in contents:
+        if content and content.strip():
+            chunks.extend(chunk_text(content, path, repo_name, repo_path))
+    stages["chunk_text"] = _throughput(time.perf_counter() - started, chunks=len(chunks))
+
+    # 3-1. 읽기 + 청크 분할 (인덱싱 파이프라인과 같은 프로세스 풀 경로, 한 번 실행하여 워커 시작 시간은 제외)
+    for _ in range(2):
+        started = time.perf_counter()
+        pool_chunks = 0
+        async for _, file_chunks in ingest_pool.iter_file_chunks(file_paths, repo_name, repo_path):
+            pool_chunks += len(file_chunks or [])
+    stages["ingest_pool"] = _throughput(time.perf_counter() - started, files=len(file_paths), chunks=pool_chunks)
+    stages["ingest_pool"]["workers"] = ingest_pool.INGEST_WORKERS
+
+    # 4. 임베딩 (파이프라인과 같은 배치 크기로 순차 호출)
+    batch_size = indexing_service.PIPELINE_BATCH_SIZE
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    started = time.perf_counter()
+    embeddings = []
+    for batch in batches:
+        embeddings.extend(await fake.get_embeddings([chunk["content"] for chunk in batch]))
+    stages["embedding"] = _throughput(time.perf_counter() - started, chunks=len(chunks))
+    stages["embedding"]["calls"] = len(batches)
+
+    # 5. Chroma 저장 (벤치마크 전용 컬렉션)
+    started = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        batch = chunks[i:i + batch_size]
+        await add_documents_to_collection(
+            "benchmark_stage_chroma_add",
+            [chunk["content"] for chunk in batch],
+            [chunk["metadata"] for chunk in batch],
+            embeddings[i:i + batch_size],
+            [str(uuid.uuid4()) for _ in batch]
+        )
+    stages["chroma_add"] = _throughput(time.perf_counter() - started, chunks=len(chunks))
+
+    # 6. 전체 인덱싱 (클론 -> 스캔 -> 스트리밍 파이프라인 -> 정리), 단계가 겹쳐 실행되는 실제 경로
+    started = time.perf_counter()
+    result = await indexing_service.index_repository(str(repo_path), repo_name, "main", None, incremental=False)
+    stages["index_repository"] = _throughput(
+        time.perf_counter() - started, files=result["total_files"], chunks=result["total_chunks_processed"]
+    )
+
+    # 7. 질의 (캐시를 비우고 매번 검색/답변을 새로 수행)
+    queries = _build_queries(repo_info["symbols"], args.queries)
+    query_results = {}
+    for mode in args.modes.split(","):
+        retrieval_times, end_to_end_times = [], []
+        for query_text in queries:
+            for cache in (query_cache.query_embedding_cache, query_cache.retrieval_cache, query_cache.answer_cache):
+                cache.clear()
+            started = time.perf_counter()
+            await main._retrieve_context(query_text, repo_name, args.n_results, {}, mode)
+            retrieval_times.append(time.perf_counter() - started)
+
+            for cache in (query_cache.query_embedding_cache, query_cache.retrieval_cache, query_cache.answer_cache):
+                cache.clear()
+            started = time.perf_counter()
+            await main.query_repo(query_text, repo_name, args.n_results, mode)
+            end_to_end_times.append(time.perf_counter() - started)
+        query_results[mode] = {
+            "retrieval": _latency_summary(retrieval_times),
+            "end_to_end": _latency_summary(end_to_end_times),
+        }
+
+    return {
+        "benchmark": "repomind",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "repo": {"files": repo_info["files"], "bytes": repo_info["bytes"], "generate_seconds": round(generate_seconds, 3)},
+        "stages": stages,
+        "query": query_results,
+        "fake_openai": {
+            "embedding_calls": fake.embedding_calls,
+            "embedded_texts": fake.embedded_texts,
+            "llm_calls": fake.llm_calls,
+        },
+    }
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RepoMind 인덱싱/질의 벤치마크")
+    parser.add_argument("--files", type=int, default=300, help="생성할 파일 수")
+    parser.add_argument("--languages", default="python=0.4,typescript=0.2,javascript=0.1,java=0.1,go=0.1,markdown=0.1",
+                        help="언어 비율 (예: python=0.5,markdown=0.5)")
+    parser.add_argument("--units-per-file", type=int, default=8, help="파일당 평균 함수/클래스/섹션 수")
+    parser.add_argument("--lines-per-unit", type=int, default=12, help="함수/섹션당 줄 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0, help="가짜 임베딩 요청당 지연 시간")
+    parser.add_argument("--embed-per-text-ms", type=float, default=0.05, help="가짜 임베딩 텍스트당 추가 지연 시간")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="가짜 AI 답변 생성 지연 시간")
+    parser.add_argument("--dimension", type=int, default=256, help="가짜 임베딩 차원")
+    parser.add_argument("--queries", type=int, default=50, help="모드별 질의 수")
+    parser.add_argument("--n-results", type=int, default=10)
+    parser.add_argument("--modes", default="vector,hybrid", help="측정할 검색 모드 (vector, lexical, hybrid)")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (없으면 표준 출력)")
+    parser.add_argument("--keep", action="store_true", help="임시 작업 디렉토리를 지우지 않음")
+    return parser.parse_args(argv)
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    original_cwd = Path.cwd()
+    workdir = Path(tempfile.mkdtemp(prefix="repomind-bench-"))
+    try:
+        results = asyncio.run(run_benchmark(args, workdir))
+    finally:
+        os.chdir(original_cwd)
+        if args.keep:
+            print(f"작업 디렉토리: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if output:
+        output.write_text(text + "\n", encoding="utf-8")
+        print(f"벤치마크 결과 저장: {output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
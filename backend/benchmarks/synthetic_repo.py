@@ -0,0 +1,165 @@
+# backend/benchmarks/synthetic_repo.py
+"""
+벤치마크용 가상 레포지토리 생성기.
+언어 비율과 파일 수/크기를 지정하면 실제 코드와 비슷한 구조(함수, 클래스, 문서 섹션)의 파일을 만들고 git 커밋까지 합니다.
+같은 seed로 만들면 항상 같은 레포지토리가 생성됩니다.
+"""
+
+import random
+import subprocess
+from pathlib import Path
+
+# 언어별 확장자
+LANGUAGE_EXTENSIONS = {
+    "python": ".py",
+    "javascript": ".js",
+    "typescript": ".ts",
+    "java": ".java",
+    "go": ".go",
+    "markdown": ".md",
+}
+
+_WORDS = [
+    "user", "config", "request", "response", "cache", "index", "token", "repo", "file", "chunk",
+    "parse", "load", "save", "build", "query", "vector", "stream", "job", "queue", "worker",
+    "session", "client", "server", "handler", "event", "message", "batch", "result", "state", "path",
+]
+
+
+def _identifier(rng: random.Random, style: str) -> str:
+    words = rng.sample(_WORDS, rng.randint(2, 3))
+    if style == "snake":
+        return "_".join(words)
+    if style == "pascal":
+        return "".join(word.capitalize() for word in words)
+    return words[0] + "".join(word.capitalize() for word in words[1:])
+
+def _body_lines(rng: random.Random, indent: str, count: int, comment: str) -> list[str]:
+    lines = []
+    for i in range(count):
+        a, b = rng.sample(_WORDS, 2)
+        if i % 4 == 0:
+            lines.append(f"{indent}{comment} {a} {b} 처리 단계 {i}")
+        else:
+            lines.append(f"{indent}{a}_{b}_{i} = {a}_{i % 3} + {rng.randint(0, 999)}" if comment == "#"
+                         else f"{indent}var {a}{b.capitalize()}{i} = {a}{i % 3} + {rng.randint(0, 999)};")
+    return lines
+
+def _python_file(rng: random.Random, units: int, lines_per_unit: int, symbols: list[str]) -> str:
+    out = ["import os", "import logging", "", "logger = logging.getLogger(__name__)", ""]
+    for _ in range(units):
+        if rng.random() < 0.3:
+            name = _identifier(rng, "pascal")
+            symbols.append(name)
+            out += [f"class {name}:", f'    """{name} 클래스"""', ""]
+            for _ in range(rng.randint(1, 3)):
+                method = _identifier(rng, "snake")
+                symbols.append(method)
+                out += [f"    def {method}(self, value):"]
+                out += _body_lines(rng, "        ", lines_per_unit, "#")
+                out += ["        return value", ""]
+        else:
+            name = _identifier(rng, "snake")
+            symbols.append(name)
+            out += [f"def {name}(path, options=None):", f'    """{name.replace("_", " ")} 함수"""']
+            out += _body_lines(rng, "    ", lines_per_unit, "#")
+            out += ["    return path", "", ""]
+    return "\n".join(out)
+
+def _brace_file(rng: random.Random, units: int, lines_per_unit: int, symbols: list[str], language: str) -> str:
+    out = []
+    if language == "java":
+        class_name = _identifier(rng, "pascal")
+        symbols.append(class_name)
+        out += ["package com.example;", "", f"public class {class_name} {{"]
+        for _ in range(units):
+            name = _identifier(rng, "camel")
+            symbols.append(name)
+            out += [f"    public int {name}(int value) {{"]
+            out += _body_lines(rng, "        ", lines_per_unit, "//")
+            out += ["        return value;", "    }", ""]
+        out.append("}")
+    elif language == "go":
+        out += ["package main", "", 'import "fmt"', ""]
+        for _ in range(units):
+            name = _identifier(rng, "pascal")
+            symbols.append(name)
+            out += [f"func {name}(value int) int {{"]
+            out += _body_lines(rng, "\t", lines_per_unit, "//")
+            out += ['\tfmt.Println(value)', "\treturn value", "}", ""]
+    else:
+        typed = language == "typescript"
+        for _ in range(units):
+            name = _identifier(rng, "camel")
+            symbols.append(name)
+            signature = f"export function {name}(value: number): number {{" if typed else f"function {name}(value) {{"
+            out += [signature]
+            out += _body_lines(rng, "  ", lines_per_unit, "//")
+            out += ["  return value;", "}", ""]
+    return "\n".join(out)
+
+def _markdown_file(rng: random.Random, units: int, lines_per_unit: int, symbols: list[str]) -> str:
+    title = _identifier(rng, "pascal")
+    symbols.append(title)
+    out = [f"# {title}", ""]
+    for _ in range(units):
+        section = " ".join(rng.sample(_WORDS, 3)).capitalize()
+        out += [f"## {section}", ""]
+        for _ in range(lines_per_unit):
+            out.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 16))) + ".")
+        out.append("")
+    return "\n".join(out)
+
+def parse_language_mix(spec: str) -> dict[str, float]:
+    """"python=0.5,javascript=0.3,markdown=0.2" 형식의 언어 비율을 파싱합니다."""
+    mix = {}
+    for part in spec.split(","):
+        language, _, weight = part.partition("=")
+        language = language.strip()
+        if language not in LANGUAGE_EXTENSIONS:
+            raise ValueError(f"지원하지 않는 언어입니다: {language} (가능한 값: {', '.join(LANGUAGE_EXTENSIONS)})")
+        mix[language] = float(weight or 1)
+    return mix
+
+def generate_repo(
+    repo_path: Path,
+    num_files: int,
+    language_mix: dict[str, float],
+    units_per_file: int = 8,
+    lines_per_unit: int = 12,
+    seed: int = 0
+) -> dict:
+    """
+    repo_path에 가상 레포지토리를 만들고 git으로 커밋합니다.
+    생성된 파일 수, 전체 바이트 수, 파일에 들어간 심볼(함수/클래스 이름) 목록을 반환합니다.
+    """
+    rng = random.Random(seed)
+    repo_path.mkdir(parents=True, exist_ok=True)
+    languages = list(language_mix)
+    weights = [language_mix[language] for language in languages]
+    symbols: list[str] = []
+    total_bytes = 0
+
+    for i in range(num_files):
+        language = rng.choices(languages, weights)[0]
+        # 실제 레포처럼 여러 단계의 디렉토리에 나누어 배치
+        directory = repo_path / f"pkg{i % 7}" / f"module{i % 13}"
+        directory.mkdir(parents=True, exist_ok=True)
+        units = max(1, int(rng.gauss(units_per_file, units_per_file / 3)))
+        if language == "python":
+            content = _python_file(rng, units, lines_per_unit, symbols)
+        elif language == "markdown":
+            content = _markdown_file(rng, units, lines_per_unit, symbols)
+        else:
+            content = _brace_file(rng, units, lines_per_unit, symbols, language)
+        path = directory / f"file_{i}{LANGUAGE_EXTENSIONS[language]}"
+        path.write_text(content, encoding="utf-8")
+        total_bytes += len(content.encode("utf-8"))
+
+    def git(*args):
+        subprocess.run(["git", "-C", str(repo_path), *args], check=True, capture_output=True)
+
+    git("init", "-b", "main")
+    git("add", "-A")
+    git("-c", "user.name=benchmark", "-c", "user.email=benchmark@localhost", "commit", "-q", "-m", "synthetic repository")
+    return {"files": num_files, "bytes": total_bytes, "symbols": symbols}